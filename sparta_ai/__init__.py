@@ -0,0 +1 @@
+"""Sparta-AI data services."""
@@ -0,0 +1,1397 @@
+"""Data cleaning and preprocessing utilities for uploaded datasets."""
+
+import logging
+import os
+import re
+import string
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from functools import reduce
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    _HAS_PYARROW = True
+except ImportError:  # pragma: no cover - optional dependency
+    pa = pc = None
+    _HAS_PYARROW = False
+
+try:
+    import polars as pl
+    _HAS_POLARS = True
+except ImportError:  # pragma: no cover - optional dependency
+    pl = None
+    _HAS_POLARS = False
+
+try:
+    import dask.dataframe as dd
+    _HAS_DASK = True
+except ImportError:  # pragma: no cover - optional dependency
+    dd = None
+    _HAS_DASK = False
+
+try:
+    import faiss
+    _HAS_FAISS = True
+except ImportError:  # pragma: no cover - optional dependency
+    faiss = None
+    _HAS_FAISS = False
+
+try:
+    from numba import njit, prange
+    _HAS_NUMBA = True
+except ImportError:  # pragma: no cover - optional dependency
+    njit = prange = None
+    _HAS_NUMBA = False
+
+if _HAS_NUMBA:
+    @njit(parallel=True, cache=True)
+    def _row_inlier_mask(arr, lower, upper):
+        n_rows, n_cols = arr.shape
+        out = np.ones(n_rows, np.bool_)
+        for i in prange(n_rows):
+            for j in range(n_cols):
+                value = arr[i, j]
+                # NaN cells (value != value) never disqualify a row.
+                if value == value and (value < lower[j] or value > upper[j]):
+                    out[i] = False
+                    break
+        return out
+
+    @njit(cache=True)
+    def _nanmean_kernel(arr):
+        total = 0.0
+        count = 0
+        for value in arr:
+            if not np.isnan(value):
+                total += value
+                count += 1
+        return total / count if count else np.nan
+
+    @njit(cache=True)
+    def _nanmedian_kernel(arr):
+        kept = arr[~np.isnan(arr)]
+        return np.median(kept) if kept.size else np.nan
+else:
+    _nanmean_kernel = np.nanmean
+    _nanmedian_kernel = np.nanmedian
+
+    def _row_inlier_mask(arr, lower, upper):
+        return (((arr >= lower) & (arr <= upper)) | np.isnan(arr)).all(axis=1)
+
+# Rows of missing data imputed per KNN search batch; bounds the size of the
+# neighbour/distance matrices instead of materializing an O(N^2) pairwise one.
+_KNN_CHUNK_ROWS = 8192
+
+# Text-cleaning patterns, compiled once at import rather than per call. The
+# fused pattern strips punctuation and digits in a single traversal.
+_PUNCT_RE = re.compile(r'[^\w\s]')
+_DIGIT_RE = re.compile(r'\d+')
+_PUNCT_OR_DIGIT_RE = re.compile(r'[^\w\s]|\d+')
+
+# RE2 (the Arrow kernels' engine) treats \w and \d as ASCII-only, unlike
+# Python's re; these spell the same Unicode classes explicitly so the
+# Arrow path doesn't strip non-ASCII letters like the ones in "café".
+_ARROW_PATTERNS = {
+    _PUNCT_RE.pattern: r'[^\p{L}\p{N}_\s]',
+    _DIGIT_RE.pattern: r'\p{Nd}+',
+    _PUNCT_OR_DIGIT_RE.pattern: r'[^\p{L}\p{N}_\s]|\p{Nd}+',
+}
+
+# Branch-free 256-entry deletion tables for the pandas fallback: a single
+# str.translate pass beats running the regexes character by character. The
+# tables cover ASCII; the Arrow path keeps full Unicode regex semantics.
+_PUNCT_TABLE = str.maketrans('', '', string.punctuation)
+_DIGIT_TABLE = str.maketrans('', '', string.digits)
+_PUNCT_AND_DIGIT_TABLE = str.maketrans('', '', string.punctuation + string.digits)
+
+# Above this row count the numeric kernels default to float32: these passes
+# are memory-bandwidth-bound, so halving bytes per element roughly doubles
+# throughput at precision that is ample for cleaning statistics.
+_LARGE_FRAME_ROWS = 1_000_000
+
+# Below this row count pandas' drop_duplicates wins on fixed overhead;
+# above it Polars' parallel hash-unique engine pays off.
+_POLARS_DEDUP_MIN_ROWS = 50_000
+
+# Per-column statistics go through a thread pool only past these sizes;
+# pandas/NumPy release the GIL inside the reductions, but thread spawn
+# overhead swamps the win on small frames.
+_PARALLEL_MIN_COLS = 8
+_PARALLEL_MIN_ROWS = 10_000
+
+
+def _map_columns(fn, columns, n_rows):
+    """Map ``fn`` over column names, threading when the frame is big enough."""
+    if len(columns) >= _PARALLEL_MIN_COLS and n_rows >= _PARALLEL_MIN_ROWS:
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as ex:
+            return list(ex.map(fn, columns))
+    return [fn(c) for c in columns]
+
+logger = logging.getLogger(__name__)
+
+# Cleaning methods return new frames without deep-copying the input: with
+# copy-on-write enabled, a shallow copy only duplicates the blocks that are
+# actually written to. Always on from pandas 3.0; opt in on pandas 2.x.
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.options.mode.copy_on_write = True
+
+
+class DataCleaner:
+    """Cleans and preprocesses pandas DataFrames ahead of analysis."""
+
+    def __init__(self):
+        self.scalers = {}
+        self.encoders = {}
+        # Force a working dtype for the numeric kernels (e.g. np.float32
+        # when downstream consumers are float32 models); None keeps the
+        # size-based default of float32 past _LARGE_FRAME_ROWS.
+        self.default_float_dtype = None
+        # Per-class row positions keyed by (id(df), target, len(df)); see
+        # _class_indices. Bounded so stale frames don't accumulate.
+        self._class_index_cache = {}
+        # convert_types plans keyed by (schema, mapping): the column
+        # partition is schema-dependent only, so streaming callers that
+        # convert many same-shaped frames skip the per-call dispatch.
+        self._convert_plan_cache = {}
+        # Running scaler moments keyed by (method, column) for
+        # normalize_column(incremental=True); see _merge_running_stats.
+        self._running_stats = {}
+        # Column partitions keyed by schema signature so repeated
+        # auto_clean runs on same-shaped frames skip the dtype walk.
+        self._dtype_partition_cache = {}
+
+    def handle_missing_values(
+        self,
+        df: pd.DataFrame,
+        strategy: str = 'auto',
+        columns: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """Fill or drop missing values.
+
+        Args:
+            df: Input DataFrame.
+            strategy: ``'auto'`` (median for numeric, forward-fill for
+                datetime, mode for everything else), ``'mean'``,
+                ``'median'``, ``'mode'``, ``'knn'`` or ``'drop'``.
+            columns: Columns to process; defaults to all columns.
+
+        Returns:
+            DataFrame with missing values handled.
+        """
+        if strategy not in ('auto', 'mean', 'median', 'mode', 'knn', 'drop'):
+            raise ValueError(f"Unknown missing-value strategy: {strategy}")
+        if columns is None:
+            columns = df.columns.tolist()
+
+        # dropna returns a fresh frame on its own; only the strategies that
+        # assign columns below need the CoW shallow copy.
+        if strategy == 'drop':
+            return df.dropna(subset=columns)
+        df_clean = df.copy(deep=False)
+        if strategy == 'knn':
+            return self._knn_impute(df_clean, columns)
+
+        # Polars executes all per-column imputations as one parallel
+        # with_columns plan; the pandas loop below stays as the fallback.
+        # Restricted to default-indexed frames since the round trip drops
+        # the index, and abandoned (None) when the frame won't convert
+        # (e.g. mixed-type object columns).
+        if (
+            _HAS_POLARS
+            and isinstance(df_clean.index, pd.RangeIndex)
+            and df_clean.index.start == 0
+            and df_clean.index.step == 1
+        ):
+            result = self._handle_missing_polars(df_clean, strategy, columns)
+            if result is not None:
+                return result
+
+        # One fused NA-count pass over the frame replaces the per-column
+        # isna().any() rescans; columns without missing values drop out here.
+        na_counts = df_clean[columns].isna().sum()
+        columns = na_counts.index[na_counts > 0].tolist()
+        if not columns:
+            return df_clean
+
+        # Numeric fill statistics are independent per column; compute them
+        # up front (threaded on big frames) and only assignment stays serial.
+        fill_stats = {}
+        if strategy in ('mean', 'median', 'auto'):
+            stat = 'mean' if strategy == 'mean' else 'median'
+            numeric_cols = [
+                c for c in columns if pd.api.types.is_numeric_dtype(df_clean[c])
+            ]
+            fill_stats = dict(
+                _map_columns(
+                    lambda c: (c, self._fill_statistic(df_clean[c], stat)),
+                    numeric_cols,
+                    len(df_clean),
+                )
+            )
+
+        # Collect every fill value first, then apply them in one
+        # DataFrame.fillna(dict) sweep: a single block-level pass with no
+        # per-column assignments fragmenting the frame.
+        fill_values = {}
+        dt_cols = []
+        if strategy in ('mean', 'median'):
+            fill_values = fill_stats
+        elif strategy == 'mode':
+            modes = df_clean[columns].mode(dropna=True)
+            if len(modes):
+                fill_values = modes.iloc[0].dropna().to_dict()
+        else:  # auto
+            dt_cols = [
+                c for c in columns
+                if pd.api.types.is_datetime64_any_dtype(df_clean[c])
+            ]
+            obj_cols = [
+                c for c in columns if c not in fill_stats and c not in dt_cols
+            ]
+            fill_values = dict(fill_stats)
+            if obj_cols:
+                modes = df_clean[obj_cols].mode(dropna=True)
+                if len(modes):
+                    fill_values.update(modes.iloc[0].dropna().to_dict())
+        if fill_values:
+            df_clean = df_clean.fillna(value=fill_values)
+        if dt_cols:
+            df_clean[dt_cols] = df_clean[dt_cols].ffill()
+        return df_clean
+
+    @staticmethod
+    def _handle_missing_polars(
+        df_clean: pd.DataFrame, strategy: str, columns: List[str]
+    ) -> Optional[pd.DataFrame]:
+        """Fill missing values with one fused Polars with_columns plan.
+
+        Returns None when the frame cannot convert to Polars (mixed-type
+        object columns and the like) so the caller's pandas path runs.
+        """
+        # Mirror the pandas path's na_counts filter: only columns with
+        # gaps get fill expressions, so complete columns keep their dtype
+        # (fill_null(median()) would promote a complete int64 to float64).
+        na_counts = df_clean[columns].isna().sum()
+        columns = na_counts.index[na_counts > 0].tolist()
+        if not columns:
+            return df_clean
+
+        try:
+            pdf = pl.from_pandas(df_clean, rechunk=False)
+        except Exception:
+            logger.debug(
+                "Frame not convertible to Polars; using the pandas fill path",
+                exc_info=True,
+            )
+            return None
+
+        numeric = [c for c in columns if pd.api.types.is_numeric_dtype(df_clean[c])]
+        datetimes = [
+            c for c in columns if pd.api.types.is_datetime64_any_dtype(df_clean[c])
+        ]
+        others = [c for c in columns if c not in numeric and c not in datetimes]
+
+        def _mode(c):
+            return pl.col(c).fill_null(pl.col(c).drop_nulls().mode().first())
+
+        if strategy in ('mean', 'median'):
+            stat = lambda c: getattr(pl.col(c), strategy)()
+            exprs = [pl.col(c).fill_null(stat(c)) for c in numeric]
+        elif strategy == 'mode':
+            exprs = [_mode(c) for c in columns]
+        else:  # auto
+            exprs = (
+                [pl.col(c).fill_null(pl.col(c).median()) for c in numeric]
+                + [pl.col(c).forward_fill() for c in datetimes]
+                + [_mode(c) for c in others]
+            )
+        if not exprs:
+            return df_clean
+        return pdf.with_columns(exprs).to_pandas()
+
+    @staticmethod
+    def _fill_statistic(series: pd.Series, statistic: str):
+        """Return the requested fill statistic for a numeric series.
+
+        Plain NumPy-backed columns go through fused nan-aware reduction
+        kernels (numba-compiled when available) on the raw buffer;
+        extension dtypes keep the pandas reductions.
+        """
+        if isinstance(series.dtype, np.dtype):
+            arr = series.to_numpy(dtype=np.float64, copy=False)
+            value = (
+                _nanmean_kernel(arr) if statistic == 'mean'
+                else _nanmedian_kernel(arr)
+            )
+            return float(value)
+        return series.mean() if statistic == 'mean' else series.median()
+
+    def _knn_impute(
+        self,
+        df_clean: pd.DataFrame,
+        columns: List[str],
+        n_neighbors: int = 5,
+    ) -> pd.DataFrame:
+        """Impute numeric columns from their k nearest complete-case rows.
+
+        The neighbour index is fit once on complete rows and incomplete rows
+        are imputed in bounded chunks, so memory stays O(chunk * k) instead
+        of the O(N^2) pairwise matrix a whole-frame fit_transform builds.
+        Uses FAISS when installed, otherwise sklearn's brute-force index.
+        """
+        numeric_cols = [
+            c for c in columns if pd.api.types.is_numeric_dtype(df_clean[c])
+        ]
+        if not numeric_cols:
+            return df_clean
+
+        arr = df_clean[numeric_cols].to_numpy(
+            dtype=self._float_dtype(len(df_clean)), copy=True
+        )
+        nan_mask = np.isnan(arr)
+        if not nan_mask.any():
+            return df_clean
+        col_means = np.nanmean(arr, axis=0)
+        col_means = np.where(np.isnan(col_means), 0.0, col_means)
+
+        incomplete_rows = np.flatnonzero(nan_mask.any(axis=1))
+        complete = arr[~nan_mask.any(axis=1)]
+        if len(complete) < n_neighbors:
+            # Too few complete rows to form neighbourhoods; fall back to means.
+            arr[nan_mask] = np.broadcast_to(col_means, arr.shape)[nan_mask]
+            df_clean[numeric_cols] = arr
+            return df_clean
+
+        complete32 = np.ascontiguousarray(complete, dtype=np.float32)
+        if _HAS_FAISS:
+            dim = complete32.shape[1]
+            if len(complete32) > 100_000:
+                # Coarse-quantized IVF search: approximate but sublinear,
+                # which is what makes >1e5-row imputation tractable.
+                nlist = int(np.sqrt(len(complete32)))
+                index = faiss.IndexIVFFlat(faiss.IndexFlatL2(dim), dim, nlist)
+                index.train(complete32)
+                index.nprobe = min(16, nlist)
+            else:
+                index = faiss.IndexFlatL2(dim)
+            index.add(complete32)
+            search = lambda q: index.search(q, n_neighbors)[1]
+        else:
+            from sklearn.neighbors import NearestNeighbors
+
+            nn = NearestNeighbors(n_neighbors=n_neighbors, algorithm='brute')
+            nn.fit(complete32)
+            search = lambda q: nn.kneighbors(q, return_distance=False)
+
+        for start in range(0, len(incomplete_rows), _KNN_CHUNK_ROWS):
+            rows = incomplete_rows[start:start + _KNN_CHUNK_ROWS]
+            chunk = arr[rows]
+            chunk_nan = nan_mask[rows]
+            # Query with column means standing in for the missing cells.
+            query = np.where(chunk_nan, col_means, chunk).astype(np.float32)
+            neigh = search(np.ascontiguousarray(query))
+            imputed = self._neighbor_means(complete, neigh, col_means)
+            arr[rows] = np.where(chunk_nan, imputed, chunk)
+
+        df_clean[numeric_cols] = arr
+        return df_clean
+
+    @staticmethod
+    def _neighbor_means(
+        complete: np.ndarray, neigh: np.ndarray, col_means: np.ndarray
+    ) -> np.ndarray:
+        """Average neighbour rows, ignoring missing (-1) ids.
+
+        FAISS IVF searches return -1 for slots the probed lists could not
+        fill; indexing with them would silently average in the last
+        complete row. Rows with no valid neighbour at all fall back to
+        the column means.
+        """
+        valid = neigh >= 0
+        gathered = complete[np.where(valid, neigh, 0)]
+        counts = valid.sum(axis=1)
+        sums = (gathered * valid[:, :, None]).sum(axis=1)
+        means = sums / np.maximum(counts, 1)[:, None]
+        return np.where(counts[:, None] == 0, col_means, means)
+
+    def remove_duplicates(
+        self,
+        df: pd.DataFrame,
+        subset: Optional[List[str]] = None,
+        keep: str = 'first',
+    ) -> pd.DataFrame:
+        """Drop duplicated rows, optionally restricted to ``subset``.
+
+        All-numeric subsets are deduplicated by viewing each row as one
+        contiguous byte record and running a single vectorized uniqueness
+        pass over the packed rows, which avoids pandas' per-row tuple
+        hashing on wide numeric data. Large default-indexed frames go
+        through Polars' parallel hash-unique engine (order preserved,
+        index renumbered); everything else uses drop_duplicates.
+        """
+        if subset and self._packable_numeric(df, subset):
+            dup = self._numeric_row_duplicated(df[subset], keep)
+            return df.iloc[np.flatnonzero(~dup)]
+        if (
+            _HAS_POLARS
+            and len(df) >= _POLARS_DEDUP_MIN_ROWS
+            and isinstance(df.index, pd.RangeIndex)
+            and df.index.start == 0
+            and df.index.step == 1
+        ):
+            out = pl.from_pandas(df, rechunk=False).unique(
+                subset=subset,
+                keep='none' if keep is False else keep,
+                maintain_order=True,
+            )
+            return out.to_pandas()
+        return df.drop_duplicates(subset=subset, keep=keep)
+
+    @staticmethod
+    def _packable_numeric(df: pd.DataFrame, subset: List[str]) -> bool:
+        """True when ``subset`` can be packed into rows without value loss.
+
+        All columns must be plain NumPy numerics and cast safely to their
+        common dtype — an int64 column mixed with floats would silently
+        round through float64 and collapse distinct large ints.
+        """
+        dtypes = [df[c].dtype for c in subset]
+        if not all(
+            isinstance(dt, np.dtype) and dt.kind in 'iufb' for dt in dtypes
+        ):
+            return False
+        common = np.result_type(*dtypes)
+        if common.kind != 'f':
+            return True
+        # NumPy calls int64->float64 "safe", but the 53-bit mantissa cannot
+        # hold every 64-bit integer; require each integer column's value
+        # bits to fit the common float's mantissa exactly.
+        mantissa = np.finfo(common).nmant + 1
+        for dt in dtypes:
+            if dt.kind in 'iu':
+                value_bits = dt.itemsize * 8 - (1 if dt.kind == 'i' else 0)
+                if value_bits > mantissa:
+                    return False
+        return True
+
+    @staticmethod
+    def _numeric_row_duplicated(block: pd.DataFrame, keep) -> np.ndarray:
+        """Return a duplicated-row mask for an all-numeric block."""
+        arr = np.ascontiguousarray(block.to_numpy())
+        if arr.ndim == 1:
+            arr = arr.reshape(-1, 1)
+        if arr.dtype.kind == 'f':
+            arr = arr + 0.0  # fold -0.0 onto 0.0 so byte equality matches value equality
+        rows = arr.view(
+            np.dtype((np.void, arr.dtype.itemsize * arr.shape[1]))
+        ).ravel()
+
+        if keep == 'first':
+            dup = np.ones(len(rows), dtype=np.bool_)
+            _, first_idx = np.unique(rows, return_index=True)
+            dup[first_idx] = False
+        elif keep == 'last':
+            dup = np.ones(len(rows), dtype=np.bool_)
+            _, first_idx = np.unique(rows[::-1], return_index=True)
+            dup[len(rows) - 1 - first_idx] = False
+        elif keep is False:
+            _, inverse, counts = np.unique(
+                rows, return_inverse=True, return_counts=True
+            )
+            dup = counts[inverse] > 1
+        else:
+            raise ValueError(f"Unknown keep value: {keep}")
+        return dup
+
+    def remove_outliers(
+        self,
+        df: pd.DataFrame,
+        columns: Optional[List[str]] = None,
+        method: str = 'iqr',
+        threshold: float = 1.5,
+    ) -> pd.DataFrame:
+        """Drop rows holding outliers in the given numeric columns.
+
+        Args:
+            df: Input DataFrame.
+            columns: Numeric columns to screen; defaults to all numeric.
+            method: ``'iqr'`` or ``'zscore'``.
+            threshold: IQR multiplier or z-score cutoff.
+
+        Returns:
+            DataFrame with outlier rows removed; NaNs are kept.
+        """
+        if method not in ('iqr', 'zscore'):
+            raise ValueError(f"Unknown outlier method: {method}")
+        # Row selection at the end produces a new frame; no copy needed.
+        df_clean = df
+        if columns is None:
+            columns = df_clean.select_dtypes(include=[np.number]).columns.tolist()
+
+        if _HAS_PYARROW and columns and all(
+            isinstance(df_clean[c].dtype, pd.ArrowDtype) for c in columns
+        ):
+            mask = self._outlier_mask_arrow(df_clean, columns, method, threshold)
+            return df_clean.iloc[mask]
+
+        df_num = df_clean[columns].select_dtypes(include=[np.number])
+        # Zero-row blocks degenerate inside nanquantile (IndexError) and
+        # there is nothing to screen anyway.
+        if not len(df_num.columns) or not len(df_num):
+            return df_clean
+
+        # One contiguous pass: per-column statistics and the row mask are
+        # computed on the 2-D block, replacing per-column Series math and
+        # the chain of intermediate boolean Series.
+        arr = df_num.to_numpy(dtype=np.float64)
+        with warnings.catch_warnings():
+            # All-NaN columns legitimately produce NaN statistics here.
+            warnings.simplefilter('ignore', category=RuntimeWarning)
+            if method == 'iqr':
+                q = np.nanquantile(arr, [0.25, 0.75], axis=0)
+                iqr = q[1] - q[0]
+                lower = q[0] - threshold * iqr
+                upper = q[1] + threshold * iqr
+            else:
+                mu = np.nanmean(arr, axis=0)
+                sd = np.nanstd(arr, axis=0)
+                lower = mu - threshold * sd
+                upper = mu + threshold * sd
+        row_mask = _row_inlier_mask(arr, lower, upper)
+        return df_clean.iloc[row_mask]
+
+    @staticmethod
+    def _arrow_fences(ca, method: str, threshold: float):
+        """Outlier fences for one Arrow column, via pyarrow.compute."""
+        if method in ('iqr', 'percentile'):
+            if method == 'iqr':
+                q1, q3 = pc.quantile(ca, q=[0.25, 0.75]).to_pylist()
+                if q1 is None or q3 is None:
+                    return None, None
+                iqr = q3 - q1
+                return q1 - threshold * iqr, q3 + threshold * iqr
+            lower, upper = pc.quantile(ca, q=[0.01, 0.99]).to_pylist()
+            return lower, upper
+        mu = pc.mean(ca).as_py()
+        sd = pc.stddev(ca).as_py()
+        if mu is None or sd is None:
+            return None, None
+        return mu - threshold * sd, mu + threshold * sd
+
+    def _outlier_mask_arrow(
+        self,
+        df_clean: pd.DataFrame,
+        columns: List[str],
+        method: str,
+        threshold: float,
+    ) -> np.ndarray:
+        """Inlier row mask computed entirely with Arrow compute kernels.
+
+        Arrow-backed columns never leave their buffers: quantiles, the
+        per-column comparisons and the combined row mask all run in
+        pyarrow.compute, and only the final boolean mask is materialized.
+        """
+        combined = None
+        for col in columns:
+            ca = pa.array(df_clean[col])
+            lower, upper = self._arrow_fences(ca, method, threshold)
+            if lower is None:
+                continue
+            # Kleene kernels: the comparisons are null for null cells, and
+            # non-Kleene or_(null, true) stays null, which the final bool
+            # cast would silently turn into "drop the row".
+            cond = pc.or_kleene(
+                pc.and_kleene(
+                    pc.greater_equal(ca, lower), pc.less_equal(ca, upper)
+                ),
+                pc.is_null(ca, nan_is_null=True),
+            )
+            combined = cond if combined is None else pc.and_kleene(combined, cond)
+        if combined is None:
+            return np.ones(len(df_clean), dtype=np.bool_)
+        return combined.to_numpy(zero_copy_only=False).astype(np.bool_)
+
+    def cap_outliers(
+        self,
+        df: pd.DataFrame,
+        columns: Optional[List[str]] = None,
+        method: str = 'iqr',
+        threshold: float = 1.5,
+        dtype: Optional[np.dtype] = None,
+    ) -> pd.DataFrame:
+        """Clip outliers in the given numeric columns to their bounds.
+
+        Args:
+            df: Input DataFrame.
+            columns: Numeric columns to cap; defaults to all numeric.
+            method: ``'iqr'`` (IQR fences) or ``'percentile'`` (1st/99th).
+            threshold: IQR multiplier; ignored for ``'percentile'``.
+            dtype: Working dtype for the clip; defaults like
+                :meth:`normalize_column` (float32 on very large frames).
+
+        Returns:
+            DataFrame with outliers clipped in place of removal.
+        """
+        df_clean = df.copy(deep=False)
+        if columns is None:
+            columns = df_clean.select_dtypes(include=[np.number]).columns.tolist()
+
+        if method not in ('iqr', 'percentile'):
+            raise ValueError(f"Unknown capping method: {method}")
+
+        if _HAS_PYARROW and columns and all(
+            isinstance(df_clean[c].dtype, pd.ArrowDtype) for c in columns
+        ):
+            return self._cap_outliers_arrow(df_clean, columns, method, threshold)
+
+        df_num = df_clean[columns].select_dtypes(include=[np.number])
+        numeric_cols = df_num.columns.tolist()
+        if not numeric_cols:
+            return df_clean
+
+        # Both fences for every column come from one quantile call, and the
+        # clip is a single broadcast np.clip over the 2-D block — no
+        # per-column Python round-trips. NaN compares false on both fences,
+        # so missing values ride through unchanged.
+        if method == 'iqr':
+            q = df_num.quantile([0.25, 0.75]).to_numpy()
+            iqr = q[1] - q[0]
+            lower, upper = q[0] - threshold * iqr, q[1] + threshold * iqr
+        else:
+            q = df_num.quantile([0.01, 0.99]).to_numpy()
+            lower, upper = q[0], q[1]
+        # All-NaN columns produce NaN fences, which np.clip would smear
+        # over the data; open them up instead.
+        lower = np.where(np.isnan(lower), -np.inf, lower)
+        upper = np.where(np.isnan(upper), np.inf, upper)
+
+        if dtype is None:
+            dtype = self._float_dtype(len(df_clean))
+        arr = df_num.to_numpy(dtype=dtype, copy=True)
+        np.clip(arr, lower, upper, out=arr)
+        df_clean[numeric_cols] = arr
+        return df_clean
+
+    def _cap_outliers_arrow(
+        self,
+        df_clean: pd.DataFrame,
+        columns: List[str],
+        method: str,
+        threshold: float,
+    ) -> pd.DataFrame:
+        """Clip Arrow-backed columns with element-wise min/max kernels."""
+        for col in columns:
+            ca = pa.array(df_clean[col])
+            lower, upper = self._arrow_fences(ca, method, threshold)
+            if lower is None:
+                continue
+            # skip_nulls=False propagates nulls instead of snapping them
+            # to the fence value.
+            clipped = pc.min_element_wise(
+                pc.max_element_wise(ca, lower, skip_nulls=False),
+                upper,
+                skip_nulls=False,
+            )
+            # Keep the kernel's output type: float fences promote integer
+            # columns, mirroring the pandas clip behaviour.
+            df_clean[col] = pd.array(clipped, dtype=pd.ArrowDtype(clipped.type))
+        return df_clean
+
+    def normalize_column(
+        self,
+        df: pd.DataFrame,
+        columns: Optional[List[str]] = None,
+        method: str = 'standard',
+        dtype: Optional[np.dtype] = None,
+        incremental: bool = False,
+    ) -> pd.DataFrame:
+        """Scale numeric columns to zero mean/unit variance or [0, 1].
+
+        Args:
+            df: Input DataFrame.
+            columns: Numeric columns to scale; defaults to all numeric.
+            method: ``'standard'`` or ``'minmax'``.
+            dtype: Working dtype for the kernel; defaults to float32 on
+                frames above one million rows and float64 below.
+            incremental: Merge this frame's statistics into running
+                per-column moments and scale with the merged values, so
+                streaming batches are each scanned exactly once instead of
+                refitting from scratch.
+
+        Returns:
+            DataFrame with the columns scaled.
+        """
+        df_clean = df.copy(deep=False)
+        if columns is None:
+            columns = df_clean.select_dtypes(include=[np.number]).columns.tolist()
+        if not columns:
+            return df_clean
+
+        # Plain NumPy with in-place subtract/divide: no sklearn validation
+        # copies, and the fitted statistics are kept as raw arrays so a
+        # later transform is just two ufunc calls.
+        if dtype is None:
+            dtype = self._float_dtype(len(df_clean))
+        if method not in ('standard', 'minmax'):
+            raise ValueError(f"Unknown normalization method: {method}")
+        arr = df_clean[columns].to_numpy(dtype=dtype, copy=True)
+        if incremental:
+            center, scale = self._merge_running_stats(columns, arr, method)
+        elif method == 'standard':
+            center = np.nanmean(arr, axis=0)
+            scale = np.nanstd(arr, axis=0)
+        else:
+            center = np.nanmin(arr, axis=0)
+            scale = np.nanmax(arr, axis=0) - center
+        scale = np.where((scale == 0) | np.isnan(scale), 1.0, scale)
+        np.subtract(arr, center, out=arr)
+        np.divide(arr, scale, out=arr)
+        df_clean[columns] = arr
+
+        for i, col in enumerate(columns):
+            self.scalers[col] = {
+                'method': method, 'center': center[i], 'scale': scale[i]
+            }
+        return df_clean
+
+    def auto_clean(
+        self,
+        df: pd.DataFrame,
+        engine: str = 'auto',
+        chunksize: Optional[int] = None,
+    ) -> pd.DataFrame:
+        """Run the standard cleaning pipeline.
+
+        The pipeline is missing-value handling, duplicate removal, outlier
+        removal and normalization. With ``engine='polars'`` (or ``'auto'``
+        when Polars is installed) the four passes are fused into a single
+        lazy Polars plan so the data is traversed once and intermediates
+        share Arrow buffers; otherwise the pandas steps run in sequence.
+
+        Args:
+            df: Input DataFrame.
+            engine: ``'auto'``, ``'pandas'`` or ``'polars'``.
+            chunksize: When set (and pyarrow is installed), stream the frame
+                as Arrow RecordBatches of at most this many rows: global
+                statistics are reduced in one pass, the per-row work runs
+                batch-by-batch with a bounded working set, and only the
+                global steps (dedup, normalization) touch the full result.
+
+        Returns:
+            Cleaned DataFrame.
+        """
+        if engine not in ('auto', 'pandas', 'polars', 'dask'):
+            raise ValueError(f"Unknown engine: {engine}")
+        if engine == 'polars' and not _HAS_POLARS:
+            raise ImportError("engine='polars' requires the polars package")
+        if engine == 'dask' and not _HAS_DASK:
+            raise ImportError("engine='dask' requires the dask package")
+
+        # Dask frames (or an explicit engine='dask') run partition-wise so
+        # datasets that exceed memory never materialize in one piece.
+        if _HAS_DASK and (engine == 'dask' or isinstance(df, dd.DataFrame)):
+            was_pandas = isinstance(df, pd.DataFrame)
+            ddf = (
+                dd.from_pandas(df, npartitions=os.cpu_count() or 1)
+                if was_pandas else df
+            )
+            result = self._auto_clean_dask(ddf)
+            logger.info("auto_clean (dask) graph built over %d partitions",
+                        result.npartitions)
+            return result.compute() if was_pandas else result
+
+        # The Polars plan is gated like the Polars fill path: the round
+        # trip drops a non-default index (the pandas chain preserves it).
+        use_polars = (
+            _HAS_POLARS
+            and engine in ('auto', 'polars')
+            and isinstance(df.index, pd.RangeIndex)
+            and df.index.start == 0
+            and df.index.step == 1
+        )
+
+        rows_before = len(df)
+        # Raw-mask NumPy sum: one C pass, no per-column Series reduction.
+        missing_before = int(df.isna().to_numpy().sum())
+        if chunksize is not None and _HAS_PYARROW:
+            df_clean = self._auto_clean_chunked(df, chunksize)
+        elif use_polars:
+            try:
+                df_clean = self._auto_clean_polars(df)
+            except Exception:
+                # Frames Polars won't convert (mixed-type object columns)
+                # still clean fine step by step.
+                logger.warning(
+                    "Polars auto_clean failed; falling back to pandas",
+                    exc_info=True,
+                )
+                df_clean = self._auto_clean_pandas(df)
+        else:
+            df_clean = self._auto_clean_pandas(df)
+        logger.info(
+            "auto_clean finished: %d -> %d rows, %d missing values filled",
+            rows_before,
+            len(df_clean),
+            missing_before,
+        )
+        return df_clean
+
+    def _auto_clean_pandas(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Step-by-step pandas implementation of :meth:`auto_clean`.
+
+        Each step returns a CoW shallow result, so the chain touches each
+        block at most once instead of deep-copying per step. The dtype
+        partition is computed once here and threaded through so the steps
+        skip their own select_dtypes rescans.
+        """
+        numeric_cols, _, _ = self._dtype_partition(df)
+        df_clean = self.handle_missing_values(df, strategy='auto')
+        df_clean = self.remove_duplicates(df_clean)
+        df_clean = self.remove_outliers(df_clean, columns=numeric_cols)
+        return self.normalize_column(df_clean, columns=numeric_cols)
+
+    def _auto_clean_dask(self, ddf):
+        """Partition-wise implementation of :meth:`auto_clean` for Dask.
+
+        Missing values are filled per partition; the outlier fences and
+        normalization statistics are global reductions computed in one
+        dask.compute round trip and broadcast back via map_partitions.
+        """
+        numeric_cols = ddf.select_dtypes(include=[np.number]).columns.tolist()
+
+        meta = ddf._meta
+        ddf = ddf.map_partitions(
+            lambda p: self.handle_missing_values(p, strategy='auto'), meta=meta
+        )
+        ddf = ddf.drop_duplicates()
+        if not numeric_cols:
+            return ddf
+
+        q1, q3 = dd.compute(
+            ddf[numeric_cols].quantile(0.25), ddf[numeric_cols].quantile(0.75)
+        )
+        iqr = q3 - q1
+        lower, upper = q1 - 1.5 * iqr, q3 + 1.5 * iqr
+
+        def _drop_outliers(p):
+            block = p[numeric_cols]
+            keep = (block.ge(lower) & block.le(upper)) | block.isna()
+            return p[keep.all(axis=1)]
+
+        ddf = ddf.map_partitions(_drop_outliers, meta=meta)
+
+        mu, sd = dd.compute(ddf[numeric_cols].mean(), ddf[numeric_cols].std(ddof=0))
+        sd = sd.where(sd != 0, 1.0)
+
+        def _normalize(p):
+            p = p.copy(deep=False)
+            p[numeric_cols] = (p[numeric_cols] - mu) / sd
+            return p
+
+        return ddf.map_partitions(_normalize, meta=meta)
+
+    def _auto_clean_chunked(self, df: pd.DataFrame, chunksize: int) -> pd.DataFrame:
+        """RecordBatch-streamed implementation of :meth:`auto_clean`.
+
+        Phase one reduces the global statistics (fill values and outlier
+        fences); phase two fills and filters batch by batch so the working
+        set stays one batch; the global phases (dedup, normalization) run
+        once on the assembled result.
+        """
+        numeric_cols, datetime_cols, other_cols = self._dtype_partition(df)
+
+        fill_values = {c: self._fill_statistic(df[c], 'median') for c in numeric_cols}
+        for col in other_cols:
+            mode = df[col].mode(dropna=True)
+            if not mode.empty:
+                fill_values[col] = mode.iloc[0]
+        bounds = {}
+        if numeric_cols:
+            q = df[numeric_cols].quantile([0.25, 0.75])
+            iqr = q.loc[0.75] - q.loc[0.25]
+            bounds = {
+                c: (q.loc[0.25, c] - 1.5 * iqr[c], q.loc[0.75, c] + 1.5 * iqr[c])
+                for c in numeric_cols
+            }
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        # Seeded with the empty head: a zero-row frame yields no batches,
+        # and concat refuses an empty list.
+        out_batches = [df.head(0)]
+        for batch in table.to_batches(max_chunksize=chunksize):
+            part = batch.to_pandas()
+            part = part.fillna(value=fill_values)
+            if datetime_cols:
+                part[datetime_cols] = part[datetime_cols].ffill()
+            if bounds:
+                mask = np.ones(len(part), dtype=np.bool_)
+                for col, (lower, upper) in bounds.items():
+                    vals = part[col].to_numpy()
+                    mask &= ((vals >= lower) & (vals <= upper)) | pd.isna(vals)
+                part = part.iloc[mask]
+            out_batches.append(part)
+
+        df_clean = pd.concat(out_batches, ignore_index=True, copy=False)
+        df_clean = self.remove_duplicates(df_clean)
+        return self.normalize_column(df_clean, columns=numeric_cols)
+
+    def _auto_clean_polars(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Fused lazy-Polars implementation of :meth:`auto_clean`."""
+        numeric_cols, datetime_cols, other_cols = self._dtype_partition(df)
+
+        lf = pl.from_pandas(df).lazy()
+        # One with_columns covering every imputation keeps this a single plan.
+        lf = lf.with_columns(
+            [pl.col(c).fill_null(pl.col(c).median()) for c in numeric_cols]
+            + [pl.col(c).forward_fill() for c in datetime_cols]
+            + [pl.col(c).fill_null(pl.col(c).drop_nulls().mode().first()) for c in other_cols]
+        )
+        lf = lf.unique(maintain_order=True)
+        if numeric_cols:
+            def _inlier(c):
+                q1, q3 = pl.col(c).quantile(0.25), pl.col(c).quantile(0.75)
+                iqr = q3 - q1
+                return pl.col(c).is_null() | pl.col(c).is_between(
+                    q1 - 1.5 * iqr, q3 + 1.5 * iqr
+                )
+
+            lf = lf.filter(reduce(lambda a, b: a & b, (_inlier(c) for c in numeric_cols)))
+            lf = lf.with_columns(
+                [
+                    ((pl.col(c) - pl.col(c).mean()) / pl.col(c).std(ddof=0)).fill_nan(0.0)
+                    for c in numeric_cols
+                ]
+            )
+        try:
+            out = lf.collect(engine='streaming')
+        except TypeError:  # older polars spelling
+            out = lf.collect(streaming=True)
+        return out.to_pandas()
+
+    def clean_text(
+        self,
+        df: pd.DataFrame,
+        columns: Optional[List[str]] = None,
+        lowercase: bool = True,
+        remove_punctuation: bool = True,
+        remove_digits: bool = False,
+    ) -> pd.DataFrame:
+        """Normalize text columns (case, whitespace, punctuation, digits).
+
+        When pyarrow is available the column is pushed through Arrow's
+        compiled RE2 string kernels; otherwise pandas string methods run
+        with the module-level precompiled patterns. Punctuation and digit
+        stripping share one fused pattern so the strings are walked once.
+
+        Args:
+            df: Input DataFrame.
+            columns: Text columns to clean; defaults to all object columns.
+            lowercase: Lower-case the text.
+            remove_punctuation: Strip non-word, non-space characters.
+            remove_digits: Strip digit runs.
+
+        Returns:
+            DataFrame with the cleaned text columns.
+        """
+        df_clean = df.copy(deep=False)
+        if columns is None:
+            columns = df_clean.select_dtypes(include=['object']).columns.tolist()
+
+        if remove_punctuation and remove_digits:
+            pattern = _PUNCT_OR_DIGIT_RE
+        elif remove_punctuation:
+            pattern = _PUNCT_RE
+        elif remove_digits:
+            pattern = _DIGIT_RE
+        else:
+            pattern = None
+
+        for col in columns:
+            if _HAS_PYARROW:
+                df_clean[col] = self._clean_text_arrow(
+                    df_clean[col], lowercase, pattern
+                )
+                continue
+            cleaned = df_clean[col].astype(str)
+            if lowercase:
+                cleaned = cleaned.str.lower()
+            if remove_punctuation and remove_digits:
+                cleaned = cleaned.str.translate(_PUNCT_AND_DIGIT_TABLE)
+            elif remove_punctuation:
+                cleaned = cleaned.str.translate(_PUNCT_TABLE)
+            elif remove_digits:
+                cleaned = cleaned.str.translate(_DIGIT_TABLE)
+            df_clean[col] = cleaned.str.strip()
+        return df_clean
+
+    @staticmethod
+    def _clean_text_arrow(series: pd.Series, lowercase: bool, pattern) -> pd.Series:
+        """Clean one text column with Arrow's RE2-backed string kernels."""
+        s = pa.array(series.astype('string[pyarrow]'))
+        if lowercase:
+            s = pc.utf8_lower(s)
+        if pattern is not None:
+            arrow_pattern = _ARROW_PATTERNS.get(pattern.pattern, pattern.pattern)
+            s = pc.replace_substring_regex(s, pattern=arrow_pattern, replacement='')
+        s = pc.utf8_trim_whitespace(s)
+        return pd.Series(
+            pd.array(s, dtype='string[pyarrow]'), index=series.index, name=series.name
+        )
+
+    def encode_categorical(
+        self,
+        df: pd.DataFrame,
+        columns: Optional[List[str]] = None,
+        method: str = 'onehot',
+        target_column: Optional[str] = None,
+        sparse: bool = False,
+    ) -> pd.DataFrame:
+        """Encode categorical columns.
+
+        Args:
+            df: Input DataFrame.
+            columns: Columns to encode; defaults to all object/categorical.
+            method: ``'onehot'``, ``'label'`` or ``'target'``.
+            target_column: Numeric column to aggregate for ``'target'``.
+            sparse: For one-hot, emit pandas sparse columns backed by a CSR
+                matrix (one nonzero per row per input column) instead of a
+                dense dummy block — an O(N) footprint instead of O(N*K) on
+                high-cardinality columns.
+
+        Returns:
+            DataFrame with the encodings applied. Target encoding adds a
+            ``<col>_te`` column per input column.
+        """
+        df_clean = df.copy(deep=False)
+        if columns is None:
+            columns = df_clean.select_dtypes(
+                include=['object', 'category']
+            ).columns.tolist()
+        if not columns:
+            return df_clean
+
+        if method == 'onehot':
+            if sparse:
+                return self._onehot_sparse(df_clean, columns)
+            # Polars builds the dummy columns in parallel over Arrow
+            # buffers; restricted to null-free inputs because to_dummies
+            # emits a _null column where get_dummies drops the row's mark.
+            if (
+                _HAS_POLARS
+                and isinstance(df_clean.index, pd.RangeIndex)
+                and df_clean.index.start == 0
+                and df_clean.index.step == 1
+                and not df_clean[columns].isna().to_numpy().any()
+            ):
+                out = pl.from_pandas(df_clean, rechunk=False).to_dummies(
+                    columns=columns, separator='_'
+                ).to_pandas()
+                # Match the get_dummies output schema exactly (bool
+                # dummies appended after the passthrough columns, sorted
+                # per source column) so a single null in the input can't
+                # flip the result shape between the two paths.
+                passthrough = [c for c in df_clean.columns if c not in columns]
+                dummy_cols = []
+                for col in columns:
+                    dummy_cols.extend(
+                        sorted(
+                            c for c in out.columns
+                            if c not in df_clean.columns
+                            and c.startswith(f'{col}_')
+                            and c not in dummy_cols
+                        )
+                    )
+                out = out[passthrough + dummy_cols]
+                out[dummy_cols] = out[dummy_cols].astype(bool)
+                return out
+            return pd.get_dummies(df_clean, columns=columns)
+        if method == 'label':
+            def _codes(col):
+                series = df_clean[col]
+                # Already-categorical columns expose their codes directly;
+                # recasting would rebuild the category hash table and copy.
+                if isinstance(series.dtype, pd.CategoricalDtype):
+                    return col, series.cat.codes.to_numpy()
+                # factorize is one hash pass with no CategoricalDtype
+                # construction; it releases the GIL, so wide frames encode
+                # columns in parallel through the shared pool helper.
+                return col, pd.factorize(
+                    series, sort=False, use_na_sentinel=True
+                )[0]
+
+            for col, codes in _map_columns(_codes, columns, len(df_clean)):
+                df_clean[col] = codes
+            return df_clean
+        if method == 'target':
+            if target_column is None:
+                raise ValueError("target encoding requires target_column")
+            y = df_clean[target_column].to_numpy(dtype=np.float64)
+            for col in columns:
+                # Categorical codes + bincount give the per-category mean in
+                # one indexed accumulation, skipping the hash-groupby path.
+                cats = pd.Categorical(df_clean[col])
+                codes = cats.codes
+                known = codes >= 0
+                # NaN targets are excluded from the statistics (matching
+                # groupby(...).mean()) but their rows still receive the
+                # category mean.
+                stat_valid = known & ~np.isnan(y)
+                counts = np.bincount(
+                    codes[stat_valid], minlength=len(cats.categories)
+                )
+                sums = np.bincount(
+                    codes[stat_valid],
+                    weights=y[stat_valid],
+                    minlength=len(cats.categories),
+                )
+                means = sums / np.maximum(counts, 1)
+                means[counts == 0] = np.nan
+                encoded = np.where(known, means[codes], np.nan)
+                df_clean[f'{col}_te'] = encoded
+            return df_clean
+        raise ValueError(f"Unknown encoding method: {method}")
+
+    @staticmethod
+    def _onehot_sparse(df_clean: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+        """One-hot encode ``columns`` into CSR-backed sparse dummy columns."""
+        import scipy.sparse as sp
+
+        pieces = [df_clean.drop(columns=columns)]
+        for col in columns:
+            cats = pd.Categorical(df_clean[col])
+            codes = cats.codes
+            valid = np.flatnonzero(codes >= 0)
+            mat = sp.csr_matrix(
+                (
+                    np.ones(len(valid), dtype=np.uint8),
+                    (valid, codes[valid]),
+                ),
+                shape=(len(codes), len(cats.categories)),
+            )
+            pieces.append(
+                pd.DataFrame.sparse.from_spmatrix(
+                    mat,
+                    index=df_clean.index,
+                    columns=[f'{col}_{cat}' for cat in cats.categories],
+                )
+            )
+        return pd.concat(pieces, axis=1)
+
+    def convert_types(
+        self,
+        df: pd.DataFrame,
+        type_mapping: dict,
+    ) -> pd.DataFrame:
+        """Convert columns to the dtypes named in ``type_mapping``.
+
+        Conversions are batched per target kind — one ``apply(pd.to_numeric)``
+        over the numeric columns, one ``apply(pd.to_datetime)`` over the
+        datetime columns, and a single ``astype`` mapping for everything
+        else — instead of dispatching column by column in Python.
+
+        Args:
+            df: Input DataFrame.
+            type_mapping: Mapping of column name to target type; ``'int'``,
+                ``'float'``, ``'datetime'``, ``'category'``, ``'str'`` or any
+                dtype accepted by ``astype``.
+
+        Returns:
+            DataFrame with the requested dtypes applied.
+        """
+        missing = [c for c in type_mapping if c not in df.columns]
+        if missing:
+            raise ValueError(f"Columns not found: {missing}")
+
+        df_clean = df.copy(deep=False)
+        # Specialize on the (schema, mapping) pair: the partition below is a
+        # pure function of it, so frames arriving with the same shape (e.g.
+        # streaming ingest) reuse the compiled plan instead of re-dispatching.
+        plan_key = (
+            tuple(zip(df.columns, map(str, df.dtypes))),
+            tuple(sorted(type_mapping.items())),
+        )
+        plan = self._convert_plan_cache.get(plan_key)
+        if plan is None:
+            numeric_cols = [c for c, t in type_mapping.items() if t in ('int', 'float')]
+            dt_cols = [c for c, t in type_mapping.items() if t == 'datetime']
+            astype_map = {
+                c: t for c, t in type_mapping.items()
+                if c not in numeric_cols and c not in dt_cols
+            }
+            if len(self._convert_plan_cache) >= 32:
+                self._convert_plan_cache.pop(next(iter(self._convert_plan_cache)))
+            plan = (numeric_cols, dt_cols, astype_map)
+            self._convert_plan_cache[plan_key] = plan
+        numeric_cols, dt_cols, astype_map = plan
+
+        if numeric_cols:
+            df_clean[numeric_cols] = df_clean[numeric_cols].apply(
+                pd.to_numeric, errors='coerce'
+            )
+            int_cols = [c for c in numeric_cols if type_mapping[c] == 'int']
+            for c in int_cols:
+                if not df_clean[c].isna().any():
+                    df_clean[c] = df_clean[c].astype(np.int64)
+            # to_numeric keeps already-integer columns integer; honour an
+            # explicit 'float' target with the symmetric cast.
+            float_cols = [c for c in numeric_cols if type_mapping[c] == 'float']
+            for c in float_cols:
+                if not pd.api.types.is_float_dtype(df_clean[c]):
+                    df_clean[c] = df_clean[c].astype(np.float64)
+        if dt_cols:
+            df_clean[dt_cols] = df_clean[dt_cols].apply(
+                pd.to_datetime, errors='coerce'
+            )
+        if astype_map:
+            df_clean = df_clean.astype(astype_map, copy=False)
+        return df_clean
+
+    def handle_imbalanced_data(
+        self,
+        df: pd.DataFrame,
+        target_column: str,
+        method: str = 'oversample',
+    ) -> pd.DataFrame:
+        """Balance class sizes by resampling rows of ``df``.
+
+        Stratified in one pass: per-class row positions come from a single
+        ``groupby(...).indices`` hash scan (O(n) total, not O(classes * n)
+        boolean masks), all resample indices are drawn at once with a
+        seeded NumPy generator, and the frame is gathered exactly once.
+
+        Args:
+            df: Input DataFrame.
+            target_column: Column holding the class label.
+            method: ``'oversample'`` (draw with replacement up to the
+                largest class) or ``'undersample'`` (draw without
+                replacement down to the smallest class).
+
+        Returns:
+            A balanced DataFrame with a fresh RangeIndex.
+        """
+        if target_column not in df.columns:
+            raise ValueError(f"Target column not found: {target_column}")
+
+        df_clean = df
+        idx_map = self._class_indices(df_clean, target_column)
+        if len(idx_map) < 2:
+            return df_clean.reset_index(drop=True)
+
+        rng = np.random.default_rng(42)
+        if method == 'oversample':
+            target_size = max(len(v) for v in idx_map.values())
+            parts = [v[rng.integers(0, len(v), target_size)] for v in idx_map.values()]
+        elif method == 'undersample':
+            target_size = min(len(v) for v in idx_map.values())
+            parts = [rng.choice(v, size=target_size, replace=False) for v in idx_map.values()]
+        else:
+            raise ValueError(f"Unknown balancing method: {method}")
+
+        all_idx = np.concatenate(parts)
+        # take() is the direct positional gather; iloc adds an indexing
+        # dispatch layer on top of it.
+        return df_clean.take(all_idx).reset_index(drop=True)
+
+    def _merge_running_stats(
+        self, columns: List[str], arr: np.ndarray, method: str
+    ):
+        """Fold a batch into the running per-column scaler moments.
+
+        Standard scaling keeps (count, mean, M2) merged with Chan's
+        parallel update; minmax keeps running extrema. Returns the merged
+        center/scale vectors for the batch transform.
+        """
+        center = np.empty(len(columns))
+        scale = np.empty(len(columns))
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', category=RuntimeWarning)
+            for i, col in enumerate(columns):
+                col_arr = arr[:, i]
+                key = (method, col)
+                if method == 'standard':
+                    n_b = int(np.sum(~np.isnan(col_arr)))
+                    mean_b = float(np.nanmean(col_arr)) if n_b else 0.0
+                    m2_b = float(np.nanvar(col_arr)) * n_b if n_b else 0.0
+                    n_a, mean_a, m2_a = self._running_stats.get(key, (0, 0.0, 0.0))
+                    n = n_a + n_b
+                    if n:
+                        delta = mean_b - mean_a
+                        mean = mean_a + delta * n_b / n
+                        m2 = m2_a + m2_b + delta ** 2 * n_a * n_b / n
+                    else:
+                        mean, m2 = 0.0, 0.0
+                    self._running_stats[key] = (n, mean, m2)
+                    center[i] = mean
+                    scale[i] = np.sqrt(m2 / n) if n else 1.0
+                else:
+                    lo_b = float(np.nanmin(col_arr)) if len(col_arr) else np.inf
+                    hi_b = float(np.nanmax(col_arr)) if len(col_arr) else -np.inf
+                    lo_a, hi_a = self._running_stats.get(key, (np.inf, -np.inf))
+                    lo, hi = min(lo_a, lo_b), max(hi_a, hi_b)
+                    self._running_stats[key] = (lo, hi)
+                    center[i] = lo
+                    scale[i] = hi - lo
+        return center, scale
+
+    def _dtype_partition(self, df: pd.DataFrame):
+        """(numeric, datetime, other) column lists, cached per schema.
+
+        One walk over ``df.dtypes`` replaces the repeated select_dtypes
+        scans; the partition is pure schema, so same-shaped frames share
+        the cached lists.
+        """
+        sig = tuple(zip(df.columns, map(str, df.dtypes)))
+        partition = self._dtype_partition_cache.get(sig)
+        if partition is None:
+            numeric, datetimes, others = [], [], []
+            for col, dtype in zip(df.columns, df.dtypes):
+                kind = dtype.kind
+                if kind in 'iuf':
+                    numeric.append(col)
+                elif kind == 'M':
+                    datetimes.append(col)
+                else:
+                    others.append(col)
+            if len(self._dtype_partition_cache) >= 16:
+                self._dtype_partition_cache.pop(
+                    next(iter(self._dtype_partition_cache))
+                )
+            partition = (numeric, datetimes, others)
+            self._dtype_partition_cache[sig] = partition
+        return partition
+
+    def _float_dtype(self, n_rows: int) -> np.dtype:
+        """Working float dtype for the numeric kernels."""
+        if self.default_float_dtype is not None:
+            return self.default_float_dtype
+        return np.float32 if n_rows > _LARGE_FRAME_ROWS else np.float64
+
+    def _class_indices(self, df: pd.DataFrame, target_column: str) -> dict:
+        """Per-class row-position arrays, cached across balancing calls.
+
+        Repeated balancing of the same frame (cross-validation loops) reuses
+        the groupby result; the key includes the frame length so a frame
+        that was rebuilt at the same address misses the cache. Call
+        :meth:`invalidate_caches` after mutating a frame in place.
+        """
+        key = (id(df), target_column, len(df))
+        idx_map = self._class_index_cache.get(key)
+        if idx_map is None:
+            idx_map = df.groupby(target_column, sort=False).indices
+            if len(self._class_index_cache) >= 8:
+                self._class_index_cache.pop(next(iter(self._class_index_cache)))
+            self._class_index_cache[key] = idx_map
+        return idx_map
+
+    def invalidate_caches(self) -> None:
+        """Drop cached per-frame artifacts (class indices, convert plans,
+        running scaler moments)."""
+        self._class_index_cache.clear()
+        self._convert_plan_cache.clear()
+        self._running_stats.clear()
+        self._dtype_partition_cache.clear()
@@ -0,0 +1,540 @@
+"""In-memory data contexts for uploaded datasets."""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow.csv as pacsv
+    import pyarrow.parquet as pq
+    _HAS_PYARROW = True
+except ImportError:  # pragma: no cover - optional dependency
+    pacsv = pq = None
+    _HAS_PYARROW = False
+
+try:
+    import polars as pl
+    _HAS_POLARS = True
+except ImportError:  # pragma: no cover - optional dependency
+    pl = None
+    _HAS_POLARS = False
+
+logger = logging.getLogger(__name__)
+
+# Identifier-looking column names ("id", "user_id", "row_key", ...).
+_IDENTIFIER_RE = re.compile(r'(^|_)(id|index|key)$', re.IGNORECASE)
+
+# Combined in-memory budget for cached context DataFrames (MB); the
+# least-recently-used frames are dropped past it and lazily reloaded.
+_MAX_CONTEXT_MB = float(os.environ.get('MAX_CONTEXT_MB', 2048))
+
+# Resolved once at import: resolve() stats every path component, and batch
+# ingestion constructs many contexts. Containment is then a pure string
+# check against the normalized candidate.
+_BASE_DIR = Path(os.environ.get('UPLOADS_DIR', 'uploads')).resolve()
+
+
+class DataContext:
+    """Holds one uploaded dataset plus metadata for downstream consumers.
+
+    Slotted: a manager can hold one context per uploaded file, so
+    dropping the per-instance ``__dict__`` keeps the registry lean.
+    """
+
+    __slots__ = (
+        'file_id',
+        'file_path',
+        'filename',
+        'df',
+        'metadata',
+        '_null_counts',
+        '_numeric_cols',
+        '_categorical_cols',
+        '_datetime_cols',
+        '_corr',
+        '_stat_summary',
+        '_summary',
+        '_top_values',
+    )
+
+    def __init__(self, file_id: str, file_path: str, filename: str):
+        path = Path(file_path)
+        candidate = path if path.is_absolute() else _BASE_DIR / path
+        # normpath folds any ../ segments without touching the filesystem;
+        # commonpath then proves containment with no further syscalls.
+        candidate = Path(os.path.normpath(candidate))
+        if os.path.commonpath([str(_BASE_DIR), str(candidate)]) != str(_BASE_DIR):
+            raise ValueError(f"File path escapes the uploads directory: {file_path}")
+
+        self.file_id = file_id
+        self.file_path = candidate
+        self.filename = filename
+        self.df: Optional[pd.DataFrame] = None
+        self.metadata: Dict = {}
+        # Single-scan caches filled by _extract_metadata.
+        self._null_counts: Optional[pd.Series] = None
+        self._numeric_cols: List[str] = []
+        self._categorical_cols: List[str] = []
+        self._datetime_cols: List[str] = []
+        self._top_values: Dict = {}
+        self._invalidate_cache()
+
+    def load_data(self) -> None:
+        """Load the file into a DataFrame and extract metadata.
+
+        CSV and Parquet go through pyarrow's multithreaded readers and
+        JSON through polars when those packages are available; the pandas
+        readers remain as fallbacks. Row-based sources additionally keep a
+        compressed Feather sidecar next to the upload, so reloads after a
+        restart or cache eviction skip the slow parse entirely.
+        """
+        suffix = self.file_path.suffix.lower()
+        # Suffix stays in the cache name so same-stem uploads (d.csv vs
+        # d.json) cannot serve each other's sidecar.
+        cache_path = self.file_path.with_name(
+            self.file_path.name + '.v1.feather'
+        )
+        use_cache = _HAS_PYARROW and suffix in ('.csv', '.json', '.xlsx', '.xls')
+        if use_cache:
+            try:
+                if (
+                    cache_path.exists()
+                    and cache_path.stat().st_mtime >= self.file_path.stat().st_mtime
+                ):
+                    self.df = pd.read_feather(cache_path)
+                    self._invalidate_cache()
+                    self._extract_metadata()
+                    return
+            except Exception:
+                logger.warning(
+                    "Ignoring unreadable feather cache %s", cache_path, exc_info=True
+                )
+        try:
+            if suffix == '.csv' and _HAS_PYARROW:
+                table = pacsv.read_csv(
+                    str(self.file_path),
+                    read_options=pacsv.ReadOptions(
+                        use_threads=True, block_size=16 << 20
+                    ),
+                    # Match pandas: empty strings are missing values.
+                    convert_options=pacsv.ConvertOptions(strings_can_be_null=True),
+                )
+                self.df = table.to_pandas(split_blocks=True, self_destruct=True)
+            elif suffix == '.parquet' and _HAS_PYARROW:
+                self.df = pq.read_table(
+                    str(self.file_path), use_threads=True
+                ).to_pandas(split_blocks=True, self_destruct=True)
+            elif suffix == '.json' and _HAS_POLARS:
+                self.df = pl.read_json(str(self.file_path)).to_pandas()
+            elif suffix in ('.xlsx', '.xls'):
+                self.df = pd.read_excel(self.file_path)
+            else:
+                self.df = self._load_pandas(suffix)
+        except Exception:
+            # Arrow/polars readers are stricter than pandas about ragged
+            # input; retry once with the pandas parser before giving up.
+            logger.warning(
+                "Fast reader failed for %s; falling back to pandas",
+                self.filename,
+                exc_info=True,
+            )
+            self.df = self._load_pandas(suffix)
+        optimization = self._optimize_dataframe()
+        self._invalidate_cache()
+        self._extract_metadata()
+        if optimization:
+            self.metadata['memory_optimization'] = optimization
+        if use_cache:
+            try:
+                # Written post-downcast so the sidecar revives the
+                # optimized frame directly.
+                self.df.to_feather(cache_path, compression='zstd')
+            except Exception:
+                logger.warning(
+                    "Could not write feather cache %s", cache_path, exc_info=True
+                )
+
+    def _invalidate_cache(self) -> None:
+        """Reset memoized derivations after (re)loading the frame."""
+        self._corr: Optional[pd.DataFrame] = None
+        self._stat_summary: Dict[str, str] = {}
+        self._summary: Optional[str] = None
+
+    @staticmethod
+    def _render(df: pd.DataFrame, format: str, index: bool) -> str:
+        """Render a small frame as text for prompts or the UI.
+
+        CSV is the default: it is produced by the C writer and tokenizes
+        far smaller than to_string's padded layout. Markdown and the old
+        padded string stay available for display surfaces.
+        """
+        if format == 'csv':
+            return df.to_csv(index=index)
+        if format == 'markdown':
+            return df.to_markdown(index=index)
+        if format == 'string':
+            return df.to_string(index=index)
+        raise ValueError(f"Unknown format: {format}")
+
+    def _optimize_dataframe(self) -> Optional[Dict]:
+        """Shrink default dtypes before the frame is cached.
+
+        Integers are downcast (unsigned where possible), floats drop to
+        float32 and low-cardinality object columns become category, which
+        pays off on every later scan. Frames already using extension
+        dtypes (e.g. Arrow-backed) are left alone.
+        """
+        df = self.df
+        if any(isinstance(dt, pd.ArrowDtype) for dt in df.dtypes):
+            # Arrow-backed frames already store minimal-width buffers.
+            return None
+        before = df.memory_usage(deep=False).sum()
+        for col, dtype in df.dtypes.items():
+            series = df[col]
+            # Text lives in object columns on pandas<3 and str-dtype
+            # columns on pandas>=3; both benefit from category encoding.
+            is_text = (
+                isinstance(dtype, np.dtype) and dtype.kind == 'O'
+            ) or isinstance(dtype, pd.StringDtype)
+            if is_text and len(series):
+                if series.nunique() / len(series) < 0.5:
+                    df[col] = series.astype('category')
+            elif not isinstance(dtype, np.dtype):
+                continue
+            elif dtype.kind == 'i':
+                downcast = (
+                    'unsigned'
+                    if len(series) and series.min() >= 0 else 'integer'
+                )
+                df[col] = pd.to_numeric(series, downcast=downcast)
+            elif dtype.kind == 'f':
+                df[col] = pd.to_numeric(series, downcast='float')
+        after = df.memory_usage(deep=False).sum()
+        return {
+            'before_mb': before / (1024 * 1024),
+            'after_mb': after / (1024 * 1024),
+        }
+
+    def _load_pandas(self, suffix: str) -> pd.DataFrame:
+        if suffix == '.csv':
+            return pd.read_csv(self.file_path)
+        if suffix == '.parquet':
+            return pd.read_parquet(self.file_path)
+        if suffix == '.json':
+            return pd.read_json(self.file_path)
+        if suffix in ('.xlsx', '.xls'):
+            return pd.read_excel(self.file_path)
+        raise ValueError(f"Unsupported file format: {suffix}")
+
+    def _extract_metadata(self) -> None:
+        """Compute the metadata dict consumed by summaries and the API.
+
+        Every full-column scan happens exactly once here — one dtype walk
+        buckets the columns and one isna pass counts the nulls — and the
+        results are cached on the context for the other getters to reuse.
+        """
+        df = self.df
+        numeric_cols, datetime_cols, categorical_cols = [], [], []
+        for col, dtype in df.dtypes.items():
+            kind = dtype.kind
+            if kind in 'iuf':
+                numeric_cols.append(col)
+            elif kind == 'M':
+                datetime_cols.append(col)
+            else:
+                categorical_cols.append(col)
+        null_counts = df.isna().sum()
+        self._null_counts = null_counts
+        self._numeric_cols = numeric_cols
+        self._categorical_cols = categorical_cols
+        self._datetime_cols = datetime_cols
+
+        # One hash pass per leading categorical column serves both the
+        # unique counts reported here and the top values get_column_info
+        # serves later.
+        cat_head = categorical_cols[:10]
+        unique_value_counts = {}
+        self._top_values = {}
+        if cat_head:
+            unique_value_counts = df[cat_head].nunique().to_dict()
+            self._top_values = {
+                c: df[c].value_counts(dropna=False).head(10) for c in cat_head
+            }
+
+        self.metadata = {
+            'file_id': self.file_id,
+            'filename': self.filename,
+            'rows': len(df),
+            'columns': len(df.columns),
+            'column_names': df.columns.tolist(),
+            'dtypes': {c: str(t) for c, t in df.dtypes.items()},
+            'numeric_columns': numeric_cols,
+            'categorical_columns': categorical_cols,
+            'datetime_columns': datetime_cols,
+            'missing_values': null_counts.to_dict(),
+            'unique_value_counts': unique_value_counts,
+            'memory_usage_mb': self._estimate_memory_mb(),
+            'memory_usage_shallow_mb': df.memory_usage(deep=False).sum()
+            / (1024 * 1024),
+        }
+
+    def _estimate_memory_mb(self) -> float:
+        """Estimated deep memory footprint in MB.
+
+        memory_usage(deep=True) walks every Python object in object
+        columns, which dominates metadata extraction on wide string data.
+        Instead, take the shallow total and add a per-object-column
+        estimate extrapolated from a 1000-row sample.
+        """
+        df = self.df
+        total = float(df.memory_usage(deep=False).sum())
+        for col in self._categorical_cols:
+            series = df[col]
+            if series.dtype != object or not len(series):
+                continue
+            sample = series.sample(min(1000, len(series)), random_state=0)
+            per_row = (
+                sample.memory_usage(deep=True, index=False)
+                - sample.memory_usage(deep=False, index=False)
+            ) / len(sample)
+            total += per_row * len(series)
+        return total / (1024 * 1024)
+
+    def get_summary(self) -> str:
+        """Human-readable one-paragraph summary for prompts and the UI.
+
+        Memoized: code-generation flows read the same summary many times
+        per session.
+        """
+        if self._summary is not None:
+            return self._summary
+        m = self.metadata
+        self._summary = (
+            f"Dataset '{m['filename']}' has {m['rows']} rows and "
+            f"{m['columns']} columns. Numeric: {m['numeric_columns']}; "
+            f"categorical: {m['categorical_columns']}; datetime: "
+            f"{m['datetime_columns']}. Missing values: "
+            f"{sum(m['missing_values'].values())}."
+        )
+        return self._summary
+
+    def get_sample_data(self, n: int = 5, format: str = 'csv') -> str:
+        """First ``n`` rows rendered as text."""
+        return self._render(self.df.head(n), format, index=False)
+
+    def get_statistical_summary(self, format: str = 'csv') -> str:
+        """describe() output rendered as text (memoized per format)."""
+        cached = self._stat_summary.get(format)
+        if cached is None:
+            cached = self._render(self.df.describe(), format, index=True)
+            self._stat_summary[format] = cached
+        return cached
+
+    def get_correlation_matrix(self) -> pd.DataFrame:
+        """Pearson correlation over the numeric columns (memoized).
+
+        The O(cols^2 * rows) matrix is a pure function of the loaded
+        frame, so it is computed once per load.
+        """
+        if self._corr is None:
+            cols = self.metadata['numeric_columns']
+            numeric_df = self.df[cols]
+            if cols and not any(self._null_counts[c] for c in cols):
+                # Complete numeric block: standardized float32 cross
+                # product through multithreaded BLAS - half the bandwidth
+                # of pandas' float64 path with no NaN bookkeeping needed.
+                X = numeric_df.to_numpy(dtype=np.float32, copy=True)
+                X -= X.mean(axis=0)
+                denom = np.sqrt((X * X).sum(axis=0))
+                denom[denom == 0] = 1.0
+                C = (X.T @ X) / np.outer(denom, denom)
+                self._corr = pd.DataFrame(
+                    C.astype(np.float64), index=cols, columns=cols
+                )
+            else:
+                self._corr = numeric_df.corr(numeric_only=True)
+        return self._corr
+
+    def get_data_quality_report(self, exact: Optional[bool] = None) -> Dict:
+        """Missing/duplicate statistics for the quality panel.
+
+        Args:
+            exact: Force exact duplicate counting. By default frames past
+                100k rows estimate the duplicate count from a 5% sample —
+                the full duplicated() pass hashes every cell and is the
+                slowest call in this module on multi-GB frames.
+        """
+        df = self.df
+        if exact is None:
+            exact = len(df) < 100_000
+        if exact or not len(df):
+            duplicate_rows = int(df.duplicated().to_numpy().sum())
+        else:
+            sample = df.sample(frac=0.05, random_state=0)
+            rate = sample.duplicated().to_numpy().sum() / max(len(sample), 1)
+            duplicate_rows = int(round(rate * len(df)))
+        return {
+            'total_missing': int(self._null_counts.sum()),
+            'missing_by_column': self._null_counts.to_dict(),
+            'duplicate_rows': duplicate_rows,
+            'duplicate_count_exact': bool(exact),
+            'memory_usage_mb': self.metadata['memory_usage_mb'],
+        }
+
+    def detect_column_types(self) -> Dict[str, str]:
+        """Semantic column types (identifier, boolean, numeric, ...)."""
+        result = {col: 'datetime' for col in self._datetime_cols}
+        n_rows = len(self.df)
+        # One batched nunique per dtype bucket instead of a Series call
+        # per column.
+        if self._numeric_cols:
+            unique_counts = self.df[self._numeric_cols].nunique()
+            for col, n_unique in unique_counts.items():
+                if n_unique == 2:
+                    result[col] = 'boolean'
+                elif _IDENTIFIER_RE.search(str(col)):
+                    result[col] = 'identifier'
+                else:
+                    result[col] = 'numeric'
+        if self._categorical_cols:
+            unique_counts = self.df[self._categorical_cols].nunique()
+            for col, n_unique in unique_counts.items():
+                ratio = n_unique / n_rows if n_rows else 0
+                result[col] = 'text' if ratio > 0.5 else 'categorical'
+        return result
+
+    def get_column_info(self, column: str) -> Dict:
+        """Detail card for one column."""
+        series = self.df[column]
+        info = {
+            'dtype': str(series.dtype),
+            'missing': int(self._null_counts[column]),
+            'unique': int(series.nunique()),
+        }
+        if pd.api.types.is_numeric_dtype(series):
+            info['min'] = series.min()
+            info['max'] = series.max()
+            info['mean'] = series.mean()
+        else:
+            cached = self._top_values.get(column)
+            if cached is None:
+                cached = series.value_counts(dropna=False).head(10)
+            info['top_values'] = cached.to_dict()
+        return info
+
+    def unload(self) -> None:
+        """Drop the DataFrame (and derived caches) but keep metadata.
+
+        The context can be revived later with :meth:`load_data`; cheap
+        metadata consumers keep working against the retained dict.
+        """
+        self.df = None
+        self._null_counts = None
+        self._top_values = {}
+        self._invalidate_cache()
+
+    def to_dict(self) -> Dict:
+        return dict(self.metadata)
+
+
+class DataContextManager:
+    """Registry of loaded DataContexts keyed by file id.
+
+    Contexts are kept in LRU order under a total DataFrame memory budget:
+    past the budget the oldest frames are unloaded (metadata persists to a
+    JSON sidecar and stays in memory) and transparently reloaded from disk
+    on the next get_context. All mutations take the registry lock, so
+    concurrent request handlers are safe.
+    """
+
+    def __init__(self, max_total_mb: Optional[float] = None):
+        self.contexts: 'OrderedDict[str, DataContext]' = OrderedDict()
+        self.max_total_mb = max_total_mb if max_total_mb is not None else _MAX_CONTEXT_MB
+        self._lock = threading.RLock()
+
+    def create_context(
+        self, file_id: str, file_path: str, filename: str
+    ) -> DataContext:
+        context = DataContext(file_id, file_path, filename)
+        context.load_data()
+        with self._lock:
+            self.contexts[file_id] = context
+            self.contexts.move_to_end(file_id)
+            self._evict_over_budget()
+        return context
+
+    def _evict_over_budget(self) -> None:
+        """Unload least-recently-used frames past the memory budget."""
+        loaded = [
+            (fid, ctx) for fid, ctx in self.contexts.items() if ctx.df is not None
+        ]
+        total = sum(ctx.metadata.get('memory_usage_mb', 0.0) for _, ctx in loaded)
+        # Never evict the most recent frame, whatever the budget.
+        for fid, ctx in loaded[:-1]:
+            if total <= self.max_total_mb:
+                break
+            self._persist_metadata(ctx)
+            ctx.unload()
+            total -= ctx.metadata.get('memory_usage_mb', 0.0)
+            logger.info("Evicted context %s DataFrame (over memory budget)", fid)
+
+    @staticmethod
+    def _persist_metadata(context: DataContext) -> None:
+        """Write the cheap metadata next to the upload so eviction is lossless."""
+        try:
+            meta_dir = context.file_path.parent / '.meta'
+            meta_dir.mkdir(exist_ok=True)
+            with open(meta_dir / f"{context.file_id}.json", 'w') as fh:
+                json.dump(context.metadata, fh, default=str)
+        except OSError:
+            logger.warning("Could not persist metadata for %s", context.file_id)
+
+    async def acreate_context(
+        self, file_id: str, file_path: str, filename: str
+    ) -> DataContext:
+        """Async :meth:`create_context`.
+
+        The file read and metadata extraction run in a worker thread so a
+        large upload doesn't stall the event loop; the expensive derived
+        statistics (correlation, describe) stay lazy and compute on first
+        access.
+        """
+        context = DataContext(file_id, file_path, filename)
+        await asyncio.to_thread(context.load_data)
+        with self._lock:
+            self.contexts[file_id] = context
+            self.contexts.move_to_end(file_id)
+            self._evict_over_budget()
+        return context
+
+    def get_context(self, file_id: str) -> Optional[DataContext]:
+        with self._lock:
+            context = self.contexts.get(file_id)
+            if context is None:
+                return None
+            if context.df is None:
+                # Revive an evicted frame from disk.
+                context.load_data()
+            self.contexts.move_to_end(file_id)
+            return context
+
+    def remove_context(self, file_id: str) -> bool:
+        with self._lock:
+            return self.contexts.pop(file_id, None) is not None
+
+    def list_contexts(self) -> List[str]:
+        with self._lock:
+            return list(self.contexts.keys())
+
+    def clear_all(self) -> None:
+        with self._lock:
+            self.contexts.clear()
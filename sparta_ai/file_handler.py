@@ -0,0 +1,772 @@
+"""File loading, saving and memory optimization for uploaded datasets."""
+
+import logging
+import os
+import types
+import weakref
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    _HAS_PYARROW = True
+except ImportError:  # pragma: no cover - optional dependency
+    pa = pacsv = None
+    _HAS_PYARROW = False
+
+try:
+    import cchardet as chardet  # C implementation, 10-50x faster
+    _CHARDET_IMPL = 'cchardet'
+except ImportError:  # pragma: no cover - optional dependency
+    try:
+        import chardet
+        _CHARDET_IMPL = 'chardet'
+    except ImportError:
+        chardet = None
+        _CHARDET_IMPL = None
+
+logger = logging.getLogger(__name__)
+
+# Byte-order marks that settle the encoding without any detection work.
+_BOM_ENCODINGS = (
+    (b'\xef\xbb\xbf', 'utf-8-sig'),
+    (b'\xff\xfe\x00\x00', 'utf-32'),
+    (b'\x00\x00\xfe\xff', 'utf-32'),
+    (b'\xff\xfe', 'utf-16'),
+    (b'\xfe\xff', 'utf-16'),
+)
+
+
+class _BoundedFrameCache:
+    """LRU DataFrame cache under a byte budget.
+
+    Weighted by deep memory usage; eviction demotes frames to a weak
+    secondary index, so a frame the caller still holds can be revived
+    for free while unreferenced ones are genuinely released.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._frames: 'OrderedDict[str, pd.DataFrame]' = OrderedDict()
+        self._weights: Dict[str, int] = {}
+        self._weak: 'weakref.WeakValueDictionary[str, pd.DataFrame]' = (
+            weakref.WeakValueDictionary()
+        )
+        self._bytes = 0
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        df = self._frames.get(key)
+        if df is not None:
+            self._frames.move_to_end(key)
+            return df
+        return self._weak.get(key)
+
+    def put(self, key: str, df: pd.DataFrame) -> None:
+        if key in self._frames:
+            self._bytes -= self._weights.pop(key)
+            del self._frames[key]
+        weight = int(df.memory_usage(deep=True).sum())
+        self._frames[key] = df
+        self._weights[key] = weight
+        self._bytes += weight
+        while self._bytes > self.max_bytes and len(self._frames) > 1:
+            old_key, old_df = self._frames.popitem(last=False)
+            self._bytes -= self._weights.pop(old_key)
+            self._weak[old_key] = old_df
+            logger.info("Evicted cached frame %s (over cache budget)", old_key)
+
+    def clear(self) -> None:
+        self._frames.clear()
+        self._weights.clear()
+        self._weak.clear()
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._frames or key in self._weak
+
+
+@lru_cache(maxsize=128)
+def _parse_path_cached(file_path: str, mtime_ns: int):
+    """(basename, lower extension, format label), keyed by path+mtime."""
+    ext = os.path.splitext(file_path)[1].lower()
+    return (
+        os.path.basename(file_path),
+        ext,
+        DataProcessor.SUPPORTED_FORMATS.get(ext, 'Unknown'),
+    )
+
+
+class DataProcessor:
+    """Loads, saves and optimizes datasets stored as files."""
+
+    MAX_MEMORY_SIZE = 500 * 1024 * 1024  # bytes; above this, stream
+    CHUNK_SIZE = 100_000  # rows per chunk on the streaming paths
+
+    # Immutable: shared across instances and safe to expose.
+    SUPPORTED_FORMATS = types.MappingProxyType({
+        '.csv': 'CSV',
+        '.tsv': 'TSV',
+        '.txt': 'Text',
+        '.xlsx': 'Excel',
+        '.xls': 'Excel',
+        '.json': 'JSON',
+        '.parquet': 'Parquet',
+    })
+
+    def __init__(
+        self,
+        progress_callback: Optional[Callable] = None,
+        use_arrow_dtypes: bool = False,
+    ):
+        self.progress_callback = progress_callback
+        # Opt-in: Arrow-backed dtypes store strings dictionary-encoded
+        # with validity bitmaps (typically 3-5x smaller than object
+        # columns) but change downstream dtype semantics, so the default
+        # stays NumPy-backed.
+        self.use_arrow_dtypes = use_arrow_dtypes and _HAS_PYARROW
+        # Bounded at 4x the large-file threshold; unbounded dicts of
+        # multi-hundred-MB frames are a silent leak in long-running
+        # services.
+        self._cached_data = _BoundedFrameCache(self.MAX_MEMORY_SIZE * 4)
+
+    def clear_cache(self) -> None:
+        """Drop every cached DataFrame."""
+        self._cached_data.clear()
+
+    def get_file_info(self, file_path: str, stat_result=None) -> Dict:
+        """Describe a file with at most one stat syscall.
+
+        Loaders that already hold an ``os.stat`` result pass it through
+        ``stat_result``; repeated lookups of an unchanged file hit an
+        mtime-keyed cache without touching the filesystem again.
+        """
+        st = stat_result if stat_result is not None else os.stat(file_path)
+        name, ext, fmt = _parse_path_cached(file_path, st.st_mtime_ns)
+        return {
+            'name': name,
+            'extension': ext,
+            'format': fmt,
+            'size_bytes': st.st_size,
+            'size_mb': st.st_size / (1024 * 1024),
+            'modified': st.st_mtime,
+        }
+
+    def detect_encoding(self, file_path: str) -> str:
+        """Detect a file's text encoding with bounded, incremental reads.
+
+        A BOM in the first block settles the answer immediately. Otherwise
+        the file is streamed in 8 KB blocks through an incremental
+        detector that stops as soon as it is confident, so easy files
+        never read a large sample and hard files get as much data as they
+        need (bounded to 1 MB).
+        """
+        try:
+            with open(file_path, 'rb') as fh:
+                first = fh.read(8192)
+                for bom, encoding in _BOM_ENCODINGS:
+                    if first.startswith(bom):
+                        return encoding
+                if chardet is None:
+                    return 'utf-8'
+                detector_cls = getattr(
+                    getattr(chardet, 'universaldetector', chardet),
+                    'UniversalDetector',
+                    None,
+                )
+                if detector_cls is not None:
+                    detector = detector_cls()
+                    detector.feed(first)
+                    read = len(first)
+                    while not detector.done and read < (1 << 20):
+                        block = fh.read(8192)
+                        if not block:
+                            break
+                        detector.feed(block)
+                        read += len(block)
+                    detector.close()
+                    encoding = detector.result.get('encoding')
+                else:
+                    encoding = chardet.detect(first).get('encoding')
+                return encoding or 'utf-8'
+        except OSError as e:
+            logger.error("Error detecting encoding: %s", e)
+            return 'utf-8'
+
+    _DELIMITER_BYTES = tuple(ord(d) for d in (',', '\t', ';', '|'))
+
+    def detect_delimiter(self, file_path: str) -> str:
+        """Infer the delimiter from byte histograms of the first lines.
+
+        The 4KB sample is scanned as raw bytes: newline offsets come from
+        one vectorized comparison and each line's delimiter frequencies
+        from np.bincount, so no Python-level per-line, per-candidate
+        string counting happens. A delimiter that appears the same
+        nonzero number of times on every sampled line wins; otherwise the
+        highest total count does.
+        """
+        try:
+            with open(file_path, 'rb') as fh:
+                raw = fh.read(4096)
+        except OSError as e:
+            logger.error("Error detecting delimiter: %s", e)
+            return ','
+        if b'"' in raw:
+            # Quoted fields can embed candidate delimiters; the C csv
+            # Sniffer understands quoting where byte histograms cannot.
+            sniffed = self._sniff_delimiter(file_path)
+            if sniffed is not None:
+                return sniffed
+        arr = np.frombuffer(raw, dtype=np.uint8)
+        newlines = np.flatnonzero(arr == 0x0A)
+        # Up to 10 complete lines; an unterminated tail is ignored.
+        bounds = [0] + (newlines[:10] + 1).tolist()
+        lines = [
+            arr[a:b - 1] for a, b in zip(bounds, bounds[1:]) if b - 1 > a
+        ]
+        if not lines:
+            return ','
+
+        counts = np.array(
+            [
+                np.bincount(line, minlength=256)[list(self._DELIMITER_BYTES)]
+                for line in lines
+            ]
+        )
+        totals = counts.sum(axis=0)
+        consistent = (np.ptp(counts, axis=0) == 0) & (counts[0] > 0)
+        if consistent.any():
+            best = int(np.argmax(np.where(consistent, totals, -1)))
+        elif totals.any():
+            best = int(np.argmax(totals))
+        else:
+            return self._sniff_delimiter(file_path) or ','
+        return chr(self._DELIMITER_BYTES[best])
+
+    @staticmethod
+    def _sniff_delimiter(
+        file_path: str, encoding: str = 'utf-8'
+    ) -> Optional[str]:
+        """Delimiter via the C-accelerated csv.Sniffer; None on failure."""
+        import csv
+
+        try:
+            with open(
+                file_path, 'r', encoding=encoding, errors='replace'
+            ) as fh:
+                sample = fh.read(8192)
+            return csv.Sniffer().sniff(sample, delimiters=',\t;|').delimiter
+        except (OSError, csv.Error):
+            return None
+
+    def load_csv(
+        self,
+        file_path: str,
+        encoding: Optional[str] = None,
+        delimiter: Optional[str] = None,
+        **kwargs,
+    ) -> pd.DataFrame:
+        """Load a CSV, streaming large files instead of one big parse.
+
+        Files over ``MAX_MEMORY_SIZE`` go through pyarrow's record-batch
+        reader (multithreaded, no chunk list + concat double
+        materialization), falling back to pandas' chunked reader when
+        pyarrow is unavailable or rejects the file.
+        """
+        path = Path(file_path)
+        if encoding is None:
+            encoding = self.detect_encoding(str(path))
+        if delimiter is None:
+            delimiter = self.detect_delimiter(str(path))
+        is_large = path.stat().st_size > self.MAX_MEMORY_SIZE
+
+        if is_large and _HAS_PYARROW and not kwargs:
+            try:
+                return self._load_csv_arrow(path, encoding, delimiter)
+            except Exception:
+                logger.warning(
+                    "pyarrow CSV reader failed for %s; using pandas",
+                    path,
+                    exc_info=True,
+                )
+        if not is_large and self.use_arrow_dtypes:
+            return pd.read_csv(
+                path,
+                encoding=encoding,
+                delimiter=delimiter,
+                engine='pyarrow',
+                dtype_backend='pyarrow',
+                **kwargs,
+            )
+        if is_large:
+            if not kwargs:
+                try:
+                    result = self._load_csv_mmap_parallel(
+                        path, encoding, delimiter
+                    )
+                    if result is not None:
+                        return result
+                except Exception:
+                    logger.warning(
+                        "Parallel CSV read failed for %s; using chunked reader",
+                        path,
+                        exc_info=True,
+                    )
+            return self._load_csv_chunked(path, encoding, delimiter, **kwargs)
+        # memory_map skips the userspace read buffer (the kernel pages the
+        # file in on demand) and low_memory=False infers dtypes in one
+        # pass without intermediate object-array reallocation; both only
+        # make sense below the large-file threshold.
+        kwargs.setdefault('memory_map', True)
+        kwargs.setdefault('low_memory', False)
+        return pd.read_csv(
+            path, encoding=encoding, delimiter=delimiter, **kwargs
+        )
+
+    def _load_csv_mmap_parallel(
+        self, path: Path, encoding: str, delimiter: str
+    ) -> Optional[pd.DataFrame]:
+        """Parse byte ranges of an mmap'd CSV on a thread pool.
+
+        The file is mapped read-only, every newline offset found with one
+        vectorized comparison, and the data split into per-core ranges
+        aligned to line boundaries; pandas' C parser releases the GIL, so
+        the ranges parse concurrently and are concatenated once. Returns
+        None for quoted files, where newline alignment cannot be trusted.
+        """
+        import io
+        import mmap
+        from concurrent.futures import ThreadPoolExecutor
+
+        with open(path, 'rb') as fh:
+            mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                arr = np.frombuffer(mm, dtype=np.uint8)
+                has_quotes = bool((arr[: 1 << 20] == ord('"')).any())
+                newline_pos = np.flatnonzero(arr == 0x0A)
+                # Drop the buffer view: mmap.close() refuses while an
+                # exported pointer (the frombuffer view) is alive.
+                del arr
+                if has_quotes or not len(newline_pos):
+                    return None
+                header_end = int(newline_pos[0]) + 1
+                header = bytes(mm[:header_end])
+
+                n_workers = os.cpu_count() or 1
+                data_len = len(mm) - header_end
+                targets = [
+                    header_end + data_len * i // n_workers
+                    for i in range(1, n_workers)
+                ]
+                cut_idx = np.searchsorted(newline_pos, targets)
+                cuts = sorted(
+                    {
+                        int(newline_pos[i]) + 1
+                        for i in cut_idx
+                        if i < len(newline_pos)
+                    }
+                )
+                bounds = [header_end] + cuts + [len(mm)]
+                ranges = [
+                    (a, b) for a, b in zip(bounds, bounds[1:]) if b > a
+                ]
+
+                def _parse(span):
+                    start, end = span
+                    return pd.read_csv(
+                        io.BytesIO(header + mm[start:end]),
+                        encoding=encoding,
+                        delimiter=delimiter,
+                    )
+
+                with ThreadPoolExecutor(max_workers=n_workers) as ex:
+                    frames = list(ex.map(_parse, ranges))
+            finally:
+                mm.close()
+        return pd.concat(frames, ignore_index=True, copy=False)
+
+    def _load_csv_chunked(
+        self, path: Path, encoding: str, delimiter: str, **kwargs
+    ) -> pd.DataFrame:
+        """Chunked pandas read that avoids holding every chunk alive.
+
+        For all-fixed-width frames the total row count is known from one
+        buffered newline scan, so each chunk is written straight into
+        preallocated column buffers - peak extra memory is one chunk, not
+        the chunk list plus the concat result. Mixed/text frames (or row
+        counts thrown off by quoted newlines) fall back to concat.
+        """
+        reader = pd.read_csv(
+            path,
+            encoding=encoding,
+            delimiter=delimiter,
+            chunksize=self.CHUNK_SIZE,
+            **kwargs,
+        )
+        first = next(reader, None)
+        if first is None:
+            return pd.DataFrame()
+
+        fixed_width = all(
+            isinstance(dt, np.dtype) and dt.kind in 'iufbM'
+            for dt in first.dtypes
+        )
+        n_rows = self._count_data_rows(path) if fixed_width else -1
+
+        if fixed_width and n_rows >= len(first):
+            arrays = {
+                col: np.empty(n_rows, dtype=first[col].to_numpy().dtype)
+                for col in first.columns
+            }
+            offset = 0
+            ok = True
+            try:
+                for chunk in self._chain_chunks(first, reader):
+                    if offset + len(chunk) > n_rows:
+                        ok = False
+                        break
+                    # Buffers are typed from the first chunk; a later
+                    # chunk that inferred wider (int -> float, anything ->
+                    # object) must not be truncated into them silently.
+                    chunk_arrays = {
+                        col: chunk[col].to_numpy() for col in first.columns
+                    }
+                    if any(
+                        arr.dtype != arrays[col].dtype
+                        and not np.can_cast(arr.dtype, arrays[col].dtype, 'safe')
+                        for col, arr in chunk_arrays.items()
+                    ):
+                        ok = False
+                        break
+                    for col, arr in chunk_arrays.items():
+                        arrays[col][offset:offset + len(chunk)] = arr
+                    offset += len(chunk)
+                    if self.progress_callback:
+                        self.progress_callback(offset)
+            except Exception:
+                logger.warning(
+                    "Preallocated CSV assembly failed for %s", path, exc_info=True
+                )
+                ok = False
+            if ok and offset == n_rows:
+                return pd.DataFrame(arrays, copy=False)
+            # Row estimate wrong (quoted newlines) or dtypes drifted after
+            # the first chunk; re-read through the safe concat path.
+            logger.warning("Preallocated CSV read mismatched; re-reading %s", path)
+            reader = pd.read_csv(
+                path,
+                encoding=encoding,
+                delimiter=delimiter,
+                chunksize=self.CHUNK_SIZE,
+                **kwargs,
+            )
+            first = next(reader)
+
+        chunks = []
+        rows = 0
+        for chunk in self._chain_chunks(first, reader):
+            chunks.append(chunk)
+            rows += len(chunk)
+            if self.progress_callback:
+                self.progress_callback(rows)
+        return pd.concat(chunks, ignore_index=True, copy=False)
+
+    @staticmethod
+    def _chain_chunks(first, reader):
+        yield first
+        yield from reader
+
+    @staticmethod
+    def _count_data_rows(path: Path) -> int:
+        """Data rows (excluding header) from a buffered newline count."""
+        newlines = 0
+        last_byte = b'\n'
+        with open(path, 'rb') as fh:
+            for buf in iter(lambda: fh.read(1 << 20), b''):
+                newlines += buf.count(b'\n')
+                last_byte = buf[-1:]
+        if last_byte != b'\n':
+            newlines += 1  # unterminated final line
+        return newlines - 1  # header
+
+    def load_excel(self, file_path: str, sheet_name=0, **kwargs):
+        """Load an Excel workbook.
+
+        With ``sheet_name=None`` (all sheets) each sheet parses on its own
+        thread - sheets are independent XML parts and the parsers release
+        the GIL - instead of openpyxl walking them sequentially. The
+        Rust-backed calamine engine is preferred when installed.
+        """
+        import importlib.util
+
+        engine = (
+            'calamine'
+            if importlib.util.find_spec('python_calamine') else None
+        )
+        if sheet_name is None:
+            from concurrent.futures import ThreadPoolExecutor
+
+            xl = pd.ExcelFile(file_path, engine=engine)
+            with ThreadPoolExecutor() as ex:
+                futures = {
+                    name: ex.submit(xl.parse, name, **kwargs)
+                    for name in xl.sheet_names
+                }
+                return {name: f.result() for name, f in futures.items()}
+        return pd.read_excel(
+            file_path, sheet_name=sheet_name, engine=engine, **kwargs
+        )
+
+    def _load_tsv(self, file_path: str, **kwargs) -> pd.DataFrame:
+        return self.load_csv(file_path, delimiter='\t', **kwargs)
+
+    def load_parquet(self, file_path: str, **kwargs) -> pd.DataFrame:
+        """Load a Parquet file."""
+        return pd.read_parquet(file_path, **kwargs)
+
+    def load_json(self, file_path: str) -> pd.DataFrame:
+        """Load a JSON file into a DataFrame.
+
+        Parses with orjson when installed (several times faster than the
+        stdlib), normalizes the largest embedded record list, and for
+        files past ``MAX_MEMORY_SIZE`` streams records through ijson in
+        batches so the full object graph never materializes.
+        """
+        path = Path(file_path)
+        if path.stat().st_size > self.MAX_MEMORY_SIZE:
+            streamed = self._load_json_streaming(path)
+            if streamed is not None:
+                return streamed
+
+        with open(path, 'rb') as fh:
+            raw = fh.read()
+        try:
+            import orjson
+            data = orjson.loads(raw)
+        except ImportError:
+            import json
+            data = json.loads(raw)
+
+        if isinstance(data, list):
+            return pd.json_normalize(data)
+        if isinstance(data, dict):
+            candidate = max(
+                (v for v in data.values() if isinstance(v, list)),
+                key=len,
+                default=None,
+            )
+            if candidate is not None:
+                return pd.json_normalize(candidate)
+            return pd.json_normalize([data])
+        raise ValueError(f"Unsupported JSON structure in {file_path}")
+
+    def _load_json_streaming(self, path: Path) -> Optional[pd.DataFrame]:
+        """Stream a top-level JSON array in batches; None if unavailable."""
+        try:
+            import ijson
+        except ImportError:
+            return None
+        frames = []
+        batch = []
+        try:
+            with open(path, 'rb') as fh:
+                for item in ijson.items(fh, 'item'):
+                    batch.append(item)
+                    if len(batch) >= 10_000:
+                        frames.append(pd.json_normalize(batch))
+                        batch = []
+        except ijson.JSONError:
+            return None
+        if batch:
+            frames.append(pd.json_normalize(batch))
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True, copy=False)
+
+    # Built once at class creation - no per-call loaders dict or lambda
+    # allocation in load_file; .txt routes through load_csv, whose
+    # delimiter detection handles arbitrary separators.
+    _LOADER_BY_EXT = {
+        '.csv': load_csv,
+        '.txt': load_csv,
+        '.tsv': _load_tsv,
+        '.xlsx': load_excel,
+        '.xls': load_excel,
+        '.json': load_json,
+        '.parquet': load_parquet,
+    }
+
+    def load_file(self, file_path: str, **kwargs):
+        """Load any supported file by extension."""
+        extension = os.path.splitext(file_path)[1].lower()
+        loader = self._LOADER_BY_EXT.get(extension)
+        if loader is None:
+            raise ValueError(f"Unsupported file format: {extension}")
+        # EAFP: no exists()/resolve() prechecks (each costs stat/lstat
+        # syscalls per component); the open failing is the check.
+        try:
+            return loader(self, file_path, **kwargs)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"File not found: {file_path}") from None
+
+    def get_memory_usage(self, df: pd.DataFrame) -> Dict:
+        """Total and per-column memory usage of a frame.
+
+        The deep scan runs only when non-fixed-width columns exist (it is
+        meaningless for numeric blocks), and the per-column dict is built
+        in one zip pass over the raw values instead of Series lookups per
+        column.
+        """
+        deep = not all(
+            isinstance(dt, np.dtype) and dt.kind in 'iufbM'
+            for dt in df.dtypes
+        )
+        usage = df.memory_usage(deep=deep)
+        values = usage.to_numpy()
+        total = int(values.sum())
+        per_column = {
+            col: {'bytes': int(nbytes), 'mb': nbytes / (1024 * 1024)}
+            for col, nbytes in zip(usage.index.tolist(), values)
+        }
+        return {
+            'total_bytes': total,
+            'total_mb': total / (1024 * 1024),
+            'per_column': per_column,
+            'deep': deep,
+        }
+
+    def save_file(self, df: pd.DataFrame, file_path: str, **kwargs) -> None:
+        """Save a DataFrame in the format implied by the extension.
+
+        Parquet output is written in CHUNK_SIZE row groups through a
+        ParquetWriter with zstd compression, so saving never materializes
+        a second whole-frame Arrow table; other formats use the pandas
+        writers.
+        """
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension == '.parquet':
+            self._save_parquet_chunked(df, file_path)
+        elif extension in ('.csv', '.txt'):
+            df.to_csv(file_path, index=False, **kwargs)
+        elif extension == '.tsv':
+            df.to_csv(file_path, index=False, sep='\t', **kwargs)
+        elif extension in ('.xlsx', '.xls'):
+            df.to_excel(file_path, index=False, **kwargs)
+        elif extension == '.json':
+            df.to_json(file_path, orient='records', **kwargs)
+        else:
+            raise ValueError(f"Unsupported file format: {extension}")
+
+    def _save_parquet_chunked(self, df: pd.DataFrame, file_path: str) -> None:
+        if not _HAS_PYARROW:
+            df.to_parquet(file_path, index=False)
+            return
+        import pyarrow.parquet as pq
+
+        # Infer the schema from the first real chunk: a zero-row slice
+        # types object/string columns as Arrow null and the first
+        # write_table then fails on actual values.
+        schema = pa.Table.from_pandas(
+            df.iloc[:self.CHUNK_SIZE], preserve_index=False
+        ).schema
+        with pq.ParquetWriter(file_path, schema, compression='zstd') as writer:
+            for start in range(0, max(len(df), 1), self.CHUNK_SIZE):
+                writer.write_table(
+                    pa.Table.from_pandas(
+                        df.iloc[start:start + self.CHUNK_SIZE],
+                        schema=schema,
+                        preserve_index=False,
+                    )
+                )
+
+    def optimize_memory(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Downcast dtypes to shrink a frame's footprint.
+
+        No upfront df.copy(): every column either converts (producing a
+        new array anyway) or moves by reference into the result, so peak
+        memory stays at roughly one column of scratch instead of a second
+        full frame. The dtype dispatch is a single pass over df.dtypes.
+        """
+        if all(isinstance(dt, pd.ArrowDtype) for dt in df.dtypes):
+            # Arrow buffers are already minimal-width and dictionary-
+            # encodable; nothing left to downcast.
+            return df
+        out = {}
+        n_rows = len(df)
+        # One sizing pass: fixed-width columns are itemsize*rows (deep
+        # would walk them pointlessly), text columns pay one deep scan
+        # here, and the final figure is before minus per-column deltas -
+        # no second whole-frame memory_usage(deep=True).
+        bytes_before = 0
+        bytes_saved = 0
+        for col, dtype in df.dtypes.items():
+            series = df[col]
+            if isinstance(dtype, np.dtype) and dtype.kind != 'O':
+                col_bytes = dtype.itemsize * n_rows
+            else:
+                col_bytes = int(series.memory_usage(deep=True, index=False))
+            bytes_before += col_bytes
+            # Text lives in object columns on pandas<3 and str-dtype
+            # columns on pandas>=3; both benefit from category encoding.
+            is_text = (
+                isinstance(dtype, np.dtype) and dtype.kind == 'O'
+            ) or isinstance(dtype, pd.StringDtype)
+            converted = series
+            if is_text and n_rows:
+                # Cheap reject first: if the head of the column is already
+                # majority-unique (UUIDs, free text), the full ratio can't
+                # come in under 0.5, so skip the O(n) hash entirely.
+                sample = series.iloc[:1024]
+                if not (
+                    sample.nunique() / len(sample) > 0.5 and len(sample) >= 64
+                ):
+                    if series.nunique() / n_rows < 0.5:
+                        converted = series.astype(
+                            pd.ArrowDtype(pa.dictionary(pa.int32(), pa.string()))
+                            if self.use_arrow_dtypes else 'category'
+                        )
+            elif isinstance(dtype, np.dtype) and dtype.kind == 'i':
+                converted = pd.to_numeric(series, downcast='integer')
+            elif isinstance(dtype, np.dtype) and dtype.kind == 'f':
+                converted = pd.to_numeric(series, downcast='float')
+            out[col] = converted
+            if converted.dtype != dtype:
+                bytes_saved += col_bytes - int(
+                    converted.memory_usage(deep=True, index=False)
+                )
+        if bytes_before:
+            logger.info(
+                "optimize_memory: %.2fMB -> %.2fMB",
+                bytes_before / (1024 * 1024),
+                (bytes_before - bytes_saved) / (1024 * 1024),
+            )
+        return pd.DataFrame(out, copy=False)
+
+    def _load_csv_arrow(
+        self, path: Path, encoding: str, delimiter: str
+    ) -> pd.DataFrame:
+        """Stream a CSV through pyarrow's batch reader."""
+        read_options = pacsv.ReadOptions(
+            use_threads=True, block_size=8 << 20, encoding=encoding
+        )
+        parse_options = pacsv.ParseOptions(delimiter=delimiter)
+        batches = []
+        rows = 0
+        with pacsv.open_csv(
+            str(path), read_options=read_options, parse_options=parse_options
+        ) as reader:
+            for batch in reader:
+                batches.append(batch)
+                rows += batch.num_rows
+                if self.progress_callback:
+                    self.progress_callback(rows)
+        table = pa.Table.from_batches(batches)
+        return table.to_pandas(self_destruct=True, split_blocks=True)